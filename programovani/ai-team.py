@@ -1,4 +1,14 @@
+import argparse
+import json
 import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
 from crewai import Agent, Task, Crew, Process
 
 # Nastavení spojení na tvou lokální AI (Ollama) - zadarmo
@@ -7,54 +17,203 @@ os.environ["OPENAI_API_BASE"] = "http://localhost:11434/v1"
 os.environ["OPENAI_MODEL_NAME"] = "qwen2.5-coder" # nebo 'llama3'
 os.environ["OPENAI_API_KEY"] = "NA" # Ollama klíč nepotřebuje
 
+VYCHOZI_TEMA = 'Moderní landing page pro kavárnu'
+CHECKPOINT_SOUBOR = '.checkpoint.jsonl'
+
+
 # 1. DEFINICE AGENTŮ
-architekt = Agent(
-    role='UX/UI Architekt',
-    goal='Navrhnout logickou strukturu a moderní design webové stránky.',
-    backstory='Jsi expert na uživatelskou zkušenost a vizuální styl. Tvým výstupem je strukturovaný plán.',
-    verbose=True,
-    allow_delegation=False
-)
-
-koder = Agent(
-    role='Frontend Vývojář',
-    goal='Převést plán od architekta do čistého HTML a CSS kódu.',
-    backstory='Jsi mistr čistého kódu a responzivního designu. Používáš moderní CSS (např. Tailwind).',
-    verbose=True,
-    allow_delegation=False
-)
-
-tester = Agent(
-    role='QA Revizor',
-    goal='Zkontrolovat kód na chyby a zajistit, že odpovídá zadání.',
-    backstory='Máš oko na detaily. Hledáš chybějící tagy, špatné zobrazení na mobilu a logické chyby.',
-    verbose=True,
-    allow_delegation=False
-)
-
-dokumentarista = Agent(
-    role='Technický Dokumentarista',
-    goal='Vysvětlit, jak kód funguje, a přidat užitečné komentáře.',
-    backstory='Dokážeš i složitý kód vysvětlit jednoduše pro začátečníky.',
-    verbose=True,
-    allow_delegation=False
-)
-
-# 2. DEFINICE ÚKOLŮ
-ukol_architekt = Task(description='Navrhni strukturu pro webovou stránku na téma: {tema_webu}', agent=architekt, expected_output='Seznam sekcí a popis designu.')
-ukol_koder = Task(description='Napiš HTML a CSS kód podle návrhu architekta.', agent=koder, expected_output='Kompletní blok kódu v HTML/CSS.')
-ukol_tester = Task(description='Zkontroluj kód od vývojáře a navrhni opravy, pokud jsou nutné.', agent=tester, expected_output='Seznam oprav nebo potvrzení, že je kód v pořádku.')
-ukol_dokumentace = Task(description='Vytvoř stručný návod, jak tento kód použít a co která část dělá.', agent=dokumentarista, expected_output='Stručný manuál v češtině.')
-
-# 3. SESTAVENÍ TÝMU (CREW)
-posadka = Crew(
-    agents=[architekt, koder, tester, dokumentarista],
-    tasks=[ukol_architekt, ukol_koder, ukol_tester, ukol_dokumentace],
-    process=Process.sequential # Agenti pracují jeden po druhém
-)
-
-# 4. SPUŠTĚNÍ
-print("### AI tým začíná pracovat...")
-vysledek = posadka.kickoff(inputs={'tema_webu': 'Moderní landing page pro kavárnu'})
-print("\n\n########################\n### HOTOVO! VÝSLEDEK:\n########################\n")
-print(vysledek)
+# Agenti drží stav běhu, proto má každá posádka své vlastní instance
+# (souběžné posádky nesmí sdílet jednoho agenta).
+def vytvor_agenty(verbose=True):
+    architekt = Agent(
+        role='UX/UI Architekt',
+        goal='Navrhnout logickou strukturu a moderní design webové stránky.',
+        backstory='Jsi expert na uživatelskou zkušenost a vizuální styl. Tvým výstupem je strukturovaný plán.',
+        verbose=verbose,
+        allow_delegation=False
+    )
+
+    koder = Agent(
+        role='Frontend Vývojář',
+        goal='Převést plán od architekta do čistého HTML a CSS kódu.',
+        backstory='Jsi mistr čistého kódu a responzivního designu. Používáš moderní CSS (např. Tailwind).',
+        verbose=verbose,
+        allow_delegation=False
+    )
+
+    tester = Agent(
+        role='QA Revizor',
+        goal='Zkontrolovat kód na chyby a zajistit, že odpovídá zadání.',
+        backstory='Máš oko na detaily. Hledáš chybějící tagy, špatné zobrazení na mobilu a logické chyby.',
+        verbose=verbose,
+        allow_delegation=False
+    )
+
+    dokumentarista = Agent(
+        role='Technický Dokumentarista',
+        goal='Vysvětlit, jak kód funguje, a přidat užitečné komentáře.',
+        backstory='Dokážeš i složitý kód vysvětlit jednoduše pro začátečníky.',
+        verbose=verbose,
+        allow_delegation=False
+    )
+    return architekt, koder, tester, dokumentarista
+
+
+# 2. DEFINICE ÚKOLŮ A 3. SESTAVENÍ TÝMU (CREW)
+def vytvor_posadku(verbose=True):
+    architekt, koder, tester, dokumentarista = vytvor_agenty(verbose)
+
+    ukol_architekt = Task(description='Navrhni strukturu pro webovou stránku na téma: {tema_webu}', agent=architekt, expected_output='Seznam sekcí a popis designu.')
+    ukol_koder = Task(description='Napiš HTML a CSS kód podle návrhu architekta.', agent=koder, expected_output='Kompletní blok kódu v HTML/CSS.')
+    ukol_tester = Task(description='Zkontroluj kód od vývojáře a navrhni opravy, pokud jsou nutné.', agent=tester, expected_output='Seznam oprav nebo potvrzení, že je kód v pořádku.')
+    ukol_dokumentace = Task(description='Vytvoř stručný návod, jak tento kód použít a co která část dělá.', agent=dokumentarista, expected_output='Stručný manuál v češtině.')
+
+    return Crew(
+        agents=[architekt, koder, tester, dokumentarista],
+        tasks=[ukol_architekt, ukol_koder, ukol_tester, ukol_dokumentace],
+        process=Process.sequential # Agenti pracují jeden po druhém
+    )
+
+
+# 4. DÁVKOVÝ REŽIM
+def nacti_temata(zdroj):
+    """Témata ze souboru nebo stdin ('-'), jedno na řádek; prázdné řádky a # komentáře se přeskočí"""
+    if zdroj == '-':
+        radky = sys.stdin.read().splitlines()
+    else:
+        radky = Path(zdroj).read_text(encoding='utf-8').splitlines()
+    temata = []
+    for radek in radky:
+        radek = radek.strip()
+        if radek and not radek.startswith('#') and radek not in temata:
+            temata.append(radek)
+    return temata
+
+
+def slug(text, max_delka=60):
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    text = re.sub(r'[^a-zA-Z0-9]+', '-', text).strip('-').lower()
+    return text[:max_delka].rstrip('-') or 'tema'
+
+
+class Checkpoint:
+    """Append-only záznam hotových témat - přerušený běh pokračuje, kde skončil"""
+
+    def __init__(self, cesta):
+        self.cesta = Path(cesta)
+        self.hotovo = {}
+        self._lock = threading.Lock()
+        if self.cesta.exists():
+            for radek in self.cesta.read_text(encoding='utf-8').splitlines():
+                try:
+                    zaznam = json.loads(radek)
+                except json.JSONDecodeError:
+                    continue  # useknutý poslední řádek po pádu
+                self.hotovo[zaznam['tema']] = zaznam
+
+    def zapis(self, zaznam):
+        with self._lock:
+            with open(self.cesta, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(zaznam, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.hotovo[zaznam['tema']] = zaznam
+
+
+def zpracuj_tema(poradi, tema, vystup_dir, verbose):
+    start = time.perf_counter()
+    vysledek = vytvor_posadku(verbose).kickoff(inputs={'tema_webu': tema})
+    soubor = vystup_dir / f'{poradi:03d}-{slug(tema)}.md'
+    tmp = soubor.with_suffix('.tmp')
+    tmp.write_text(f'# {tema}\n\n{vysledek}\n', encoding='utf-8')
+    os.replace(tmp, soubor)
+    return soubor, time.perf_counter() - start
+
+
+def spust_davku(temata, vystup_dir, paralelne, verbose):
+    vystup_dir = Path(vystup_dir)
+    vystup_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint = Checkpoint(vystup_dir / CHECKPOINT_SOUBOR)
+
+    souhrn = []  # (tema, stav, sekundy, soubor)
+    zbyva = []
+    for poradi, tema in enumerate(temata, 1):
+        if tema in checkpoint.hotovo:
+            z = checkpoint.hotovo[tema]
+            souhrn.append((tema, 'přeskočeno', z.get('sekundy', 0.0), z.get('soubor', '')))
+        else:
+            zbyva.append((poradi, tema))
+
+    print(f"### Témat: {len(temata)}, hotových z minula: {len(temata) - len(zbyva)}, "
+          f"zbývá: {len(zbyva)}, souběžně: {paralelne}")
+
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=paralelne)
+    futures = {executor.submit(zpracuj_tema, poradi, tema, vystup_dir, verbose): tema
+               for poradi, tema in zbyva}
+    try:
+        for future in as_completed(futures):
+            tema = futures[future]
+            try:
+                soubor, sekundy = future.result()
+            except Exception as e:
+                souhrn.append((tema, f'chyba: {e}', 0.0, ''))
+                print(f"✗ {tema}: {e}")
+                continue
+            checkpoint.zapis({'tema': tema, 'soubor': soubor.name, 'sekundy': round(sekundy, 2)})
+            souhrn.append((tema, 'hotovo', sekundy, soubor.name))
+            print(f"✓ {tema} ({sekundy:.1f} s) -> {soubor}")
+    except KeyboardInterrupt:
+        print("\n### Přerušeno - hotová témata jsou uložena, další běh naváže.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+    vypis_souhrn(souhrn, time.perf_counter() - start)
+    return not any(stav.startswith('chyba') for _, stav, _, _ in souhrn)
+
+
+def vypis_souhrn(souhrn, celkem):
+    print("\n########################\n### SOUHRN\n########################")
+    sirka = min(max((len(t) for t, _, _, _ in souhrn), default=5), 60)
+    for tema, stav, sekundy, soubor in sorted(souhrn, key=lambda r: -r[2]):
+        print(f"{tema[:sirka]:<{sirka}}  {sekundy:8.1f} s  {stav:<12} {soubor}")
+    hotove = [s for _, stav, s, _ in souhrn if stav == 'hotovo']
+    if hotove:
+        print(f"\nDokončeno {len(hotove)} témat za {celkem:.1f} s "
+              f"(průměr {sum(hotove) / len(hotove):.1f} s na téma)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI tým (CrewAI + Ollama) - jedno téma nebo dávka témat')
+    parser.add_argument('temata', nargs='?',
+                        help="soubor s tématy (jedno na řádek) nebo '-' pro stdin; bez něj se spustí jedno téma")
+    parser.add_argument('-t', '--tema', default=VYCHOZI_TEMA, help='téma pro jednorázový běh')
+    parser.add_argument('-j', '--jobs', type=int, default=2, help='počet souběžných posádek (výchozí 2)')
+    parser.add_argument('-o', '--output-dir', default='vystupy', help='složka pro výsledky a checkpoint')
+    parser.add_argument('-q', '--quiet', action='store_true', help='vypnout podrobný výpis agentů')
+    args = parser.parse_args()
+
+    if args.temata is None:
+        # Původní chování - jedno téma, výsledek na stdout
+        print("### AI tým začíná pracovat...")
+        vysledek = vytvor_posadku(not args.quiet).kickoff(inputs={'tema_webu': args.tema})
+        print("\n\n########################\n### HOTOVO! VÝSLEDEK:\n########################\n")
+        print(vysledek)
+        return 0
+
+    temata = nacti_temata(args.temata)
+    if not temata:
+        print('Žádná témata ke zpracování.')
+        return 0
+    # Podrobné výpisy souběžných posádek by se prolínaly
+    verbose = not args.quiet and args.jobs == 1
+    ok = spust_davku(temata, args.output_dir, max(1, args.jobs), verbose)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        sys.exit(130)
@@ -1,7 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 from crewai import Agent, Task, Crew, Process
+from crewai_sessions import SessionStore
+from crewai_similarity_cache import SimilarityCache
+from crewai_tracing import RunTracer, new_run_id, trace_path
+from crewai_store import SharedStore, DEFAULT_DB_PATH, HEARTBEAT_INTERVAL, STALE_AFTER, worker_name
+import json
 import os
+import threading
+import time
 
 app = Flask(__name__)
 CORS(app)  # Povolení CORS pro volání z browseru
@@ -11,6 +18,37 @@ os.environ["OPENAI_API_BASE"] = "http://localhost:11434/v1"
 os.environ["OPENAI_MODEL_NAME"] = "qwen2.5-coder"
 os.environ["OPENAI_API_KEY"] = "NA"
 
+# Sdílený stav (SQLite) - úlohy, relace, cache a metriky vidí všechny workery;
+# soubor databáze se založí až při prvním dotazu, ne při importu
+shared_store = SharedStore(os.environ.get('CREWAI_DB', DEFAULT_DB_PATH))
+
+# Serverové relace pro /agent/task (navazující dotazy bez přeposílání kontextu)
+sessions = SessionStore(
+    token_budget=int(os.environ.get('CREWAI_SESSION_TOKEN_BUDGET', 6000)),
+    max_turns=int(os.environ.get('CREWAI_SESSION_MAX_TURNS', 20)),
+    max_sessions=int(os.environ.get('CREWAI_MAX_SESSIONS', 200)),
+    ttl=int(os.environ.get('CREWAI_SESSION_TTL', 3600)),
+    shared=shared_store
+)
+
+# Volitelná cache téměř shodných odpovědí (CREWAI_SIMILARITY_CACHE=1)
+similarity_cache = None
+if os.environ.get('CREWAI_SIMILARITY_CACHE', '0') == '1':
+    similarity_cache = SimilarityCache(
+        threshold=float(os.environ.get('CREWAI_SIMILARITY_THRESHOLD', 0.9)),
+        max_entries=int(os.environ.get('CREWAI_SIMILARITY_MAX_ENTRIES', 100000)),
+        shared=shared_store
+    )
+
+# Trasování běhů /crewai (CREWAI_TRACE=1 pro všechny běhy, jinak `trace: true` v požadavku)
+TRACE_ALL = os.environ.get('CREWAI_TRACE', '0') == '1'
+TRACE_KEEP = int(os.environ.get('CREWAI_TRACE_KEEP', 100))
+
+# Agenti níže jsou sdílení celým procesem a CrewAI si v nich drží stav běhu
+# (executor, paměť, llm) - posádky jednoho workeru proto běží postupně,
+# ať je spustí HTTP vlákno (gthread) nebo vlákno fronty úloh
+crew_lock = threading.Lock()
+
 # Definice agentů
 
 # Orchestrator - hlavní koordinátor
@@ -96,21 +134,38 @@ def get_agents():
 
 @app.route('/crewai', methods=['POST'])
 def crewai_chat():
-    """Spustí CrewAI tým na zadaný úkol"""
-    data = request.get_json()
-    tema_webu = data.get('prompt', 'Moderní landing page pro kavárnu')
-    selected_agents = data.get('agents', ['orchestrator', 'architect', 'coder', 'tester', 'documenter'])
-    use_orchestrator = data.get('use_orchestrator', True)
+    """Spustí CrewAI tým na zadaný úkol
 
-    # Mapování agentů podle vybraných ID
-    agent_map = {
-        'orchestrator': orchestrator,
-        'architect': architekt,
-        'coder': koder,
-        'tester': tester,
-        'documenter': dokumentarista
+    S `async: true` se běh jen zařadí do sdílené fronty a vrátí se `job_id`;
+    stav pak zodpoví kterýkoli worker přes GET /jobs/<job_id>.
+    """
+    data = request.get_json()
+    params = {
+        'prompt': data.get('prompt', 'Moderní landing page pro kavárnu'),
+        'agents': data.get('agents', ['orchestrator', 'architect', 'coder', 'tester', 'documenter']),
+        'use_orchestrator': data.get('use_orchestrator', True),
+        'trace': TRACE_ALL or data.get('trace', False)
     }
 
+    if data.get('async', False):
+        job_id = shared_store.create_job('crew', params)
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/jobs/{job_id}'
+        }), 202
+
+    response = run_crew(params)
+    return jsonify(response), (200 if response['success'] else 500)
+
+def run_crew(params, run_id=None):
+    """Sestaví a spustí tým; vrací slovník odpovědi (sdílí /crewai i fronta úloh)"""
+    tema_webu = params['prompt']
+    selected_agents = params['agents']
+    use_orchestrator = params['use_orchestrator']
+    run_id = run_id or new_run_id()
+
     # Vytvoření úkolů pro vybrané agenty
     tasks = []
     agents_list = []
@@ -157,32 +212,164 @@ def crewai_chat():
         ))
 
     # Sestavení týmu
+    tracer = None
+    crew_options = {}
+    if params.get('trace'):
+        tracer = RunTracer(run_id, tasks, {'prompt': tema_webu[:200], 'agents': selected_agents})
+        crew_options = {'step_callback': tracer.on_step, 'task_callback': tracer.on_task}
+
     posadka = Crew(
         agents=agents_list,
         tasks=tasks,
-        process=Process.sequential
+        process=Process.sequential,
+        **crew_options
     )
 
+    start = time.perf_counter()
     try:
         # Spuštění
-        vysledek = posadka.kickoff(inputs={'tema_webu': tema_webu})
-        return jsonify({
+        if tracer is None:
+            with crew_lock:
+                vysledek = posadka.kickoff(inputs={'tema_webu': tema_webu})
+        else:
+            try:
+                with crew_lock, tracer:
+                    vysledek = posadka.kickoff(inputs={'tema_webu': tema_webu})
+            finally:
+                tracer.save(keep=TRACE_KEEP)
+        response = {
             'success': True,
             'result': str(vysledek),
-            'agents_used': selected_agents
-        })
+            'agents_used': selected_agents,
+            'run_id': run_id
+        }
     except Exception as e:
-        return jsonify({
+        shared_store.observe('crew.errors')
+        response = {
             'success': False,
-            'error': str(e)
-        }), 500
+            'error': str(e),
+            'run_id': run_id
+        }
+    shared_store.observe('crew.run_seconds', time.perf_counter() - start)
+    if tracer is not None:
+        response['trace_url'] = f'/runs/{run_id}/trace'
+    return response
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Stav úlohy ze sdílené fronty (odpoví kterýkoli worker)"""
+    job = shared_store.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    response = {
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'worker': job['worker'],
+        'created': job['created'],
+        'started': job['started'],
+        'finished': job['finished']
+    }
+    if job['result'] is not None:
+        response['response'] = json.loads(job['result'])
+    if job['error']:
+        response['error'] = job['error']
+    return jsonify(response)
+
+def _job_worker(poll_interval):
+    """Smyčka workeru fronty: převezme úlohu, hlásí heartbeat, uloží výsledek"""
+    last_recovery = 0
+    while True:
+        if time.time() - last_recovery > STALE_AFTER / 2:
+            shared_store.recover_stale_jobs()
+            last_recovery = time.time()
+        job = shared_store.claim_job()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        done = threading.Event()
+
+        def beat(job_id=job['id']):
+            while not done.wait(HEARTBEAT_INTERVAL):
+                shared_store.heartbeat(job_id)
+
+        threading.Thread(target=beat, daemon=True).start()
+        try:
+            response = run_crew(job['payload'], run_id=job['id'])
+            owned = shared_store.finish_job(job['id'], result=json.dumps(response, ensure_ascii=False),
+                                            error=None if response['success'] else response['error'])
+        except Exception as e:
+            owned = shared_store.finish_job(job['id'], error=str(e))
+        finally:
+            done.set()
+        if not owned:
+            # Heartbeat nestihl (např. dlouhá pauza GC) a úlohu převzal jiný worker
+            print(f"⚠️  Úloha {job['id']} už nepatří workeru {worker_name()} - výsledek zahozen")
+
+def start_job_runner(threads=1, poll_interval=1.0):
+    """Spustí vlákna zpracovávající frontu úloh (v každém workeru zvlášť - po forku)"""
+    for _ in range(threads):
+        threading.Thread(target=_job_worker, args=(poll_interval,), daemon=True).start()
+
+def configure_backend(base_url):
+    """Přesměruje agenty tohoto procesu na jiný Ollama backend (crewai_serve.py)"""
+    os.environ["OPENAI_API_BASE"] = base_url
+    try:
+        from crewai import LLM
+    except ImportError:
+        return  # starší CrewAI čte backend z prostředí při volání
+    for agent in (orchestrator, architekt, koder, tester, dokumentarista):
+        agent.llm = LLM(model=f'openai/{os.environ["OPENAI_MODEL_NAME"]}',
+                        base_url=base_url, api_key=os.environ["OPENAI_API_KEY"])
+
+# Sondy load balanceru a dotazy na stav se nepočítají - volají se pořád dokola
+UNMETERED_ENDPOINTS = {'health_check', 'job_status', 'metrics'}
+
+@app.after_request
+def record_request_metrics(response):
+    if request.endpoint in UNMETERED_ENDPOINTS:
+        return response
+    shared_store.observe(f'http.{request.endpoint or "unknown"}', buffered=True)
+    if response.status_code >= 500:
+        shared_store.observe(f'http.{request.endpoint or "unknown"}.errors', buffered=True)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Sdílené metriky všech workerů"""
+    return jsonify({
+        'metrics': shared_store.metrics(),
+        'jobs': shared_store.job_counts(),
+        'worker': worker_name()
+    })
+
+@app.route('/runs/<run_id>/trace', methods=['GET'])
+def run_trace(run_id):
+    """Stáhne trace běhu (Chrome trace-event JSON pro chrome://tracing / Perfetto)"""
+    path = trace_path(run_id)
+    if path is None or not path.exists():
+        return jsonify({'success': False, 'error': 'Trace not found'}), 404
+    return send_file(path, mimetype='application/json', as_attachment=True,
+                     download_name=f'crew-trace-{run_id}.json')
 
 @app.route('/agent/task', methods=['POST'])
 def single_agent_task():
-    """Spustí jeden konkrétní agent s vlastním úkolem"""
+    """Spustí jeden konkrétní agent s vlastním úkolem
+
+    Volitelně v relaci: `session_id` (nebo `new_session: true`) zapne serverovou
+    historii, `context` (např. kód) se uloží jen při založení relace. Neznámé
+    nebo vypršelé `session_id` bez `context` vrátí 404, s ním se relace založí
+    znovu (`session_created: true` v odpovědi).
+    Bez relace se při zapnuté cache vrátí uložená odpověď na podobný úkol
+    (`cache: false` ji pro daný dotaz vypne).
+    """
     data = request.get_json()
     agent_id = data.get('agent_id')
     task_description = data.get('task')
+    session_id = data.get('session_id')
+    use_session = bool(session_id) or data.get('new_session', False)
 
     agent_map = {
         'orchestrator': orchestrator,
@@ -197,37 +384,129 @@ def single_agent_task():
 
     agent = agent_map[agent_id]
 
-    try:
-        task = Task(
-            description=task_description,
-            agent=agent,
-            expected_output='Detailní odpověď.'
-        )
+    session = None
+    session_created = False
+    if use_session:
+        # Neznámá relace bez kontextu je nejspíš vypršelá - nová by agentovi
+        # tiše chyběl kód, se kterým klient počítá
+        context = data.get('context', '')
+        session, session_created = sessions.get_or_create(session_id, agent_id, context,
+                                                          create=bool(context))
+        if session is None:
+            return jsonify({
+                'success': False,
+                'error': 'Unknown or expired session - send context to start a new one',
+                'session_id': session_id
+            }), 404
+        if session.agent_id != agent_id:
+            return jsonify({
+                'success': False,
+                'error': f'Session belongs to agent {session.agent_id}'
+            }), 409
 
-        crew = Crew(
-            agents=[agent],
-            tasks=[task],
-            process=Process.sequential
-        )
+    use_cache = similarity_cache is not None and session is None and data.get('cache', True)
+    if use_cache:
+        hit = similarity_cache.lookup(agent_id, task_description)
+        if hit is not None:
+            answer, score, exact = hit
+            shared_store.observe('cache.approximate_hits' if not exact else 'cache.hits')
+            return jsonify({
+                'success': True,
+                'result': answer,
+                'agent': agent_id,
+                'cached': True,
+                'approximate': not exact,
+                'similarity': score
+            })
 
-        result = crew.kickoff()
+    try:
+        if session is None:
+            result = _run_single_agent(agent, task_description)
+            if use_cache:
+                similarity_cache.store(agent_id, task_description, str(result))
+        else:
+            with session.lock:
+                result = _run_single_agent(agent, session.render_prompt(task_description))
+                sessions.record_turn(session, task_description, str(result))
 
-        return jsonify({
+        response = {
             'success': True,
             'result': str(result),
             'agent': agent_id
-        })
+        }
+        if session is not None:
+            response['session'] = session.to_dict()
+            response['session_id'] = session.id
+            response['session_created'] = session_created
+        return jsonify(response)
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def _run_single_agent(agent, description):
+    task = Task(
+        description=description,
+        agent=agent,
+        expected_output='Detailní odpověď.'
+    )
+
+    crew = Crew(
+        agents=[agent],
+        tasks=[task],
+        process=Process.sequential
+    )
+
+    start = time.perf_counter()
+    try:
+        with crew_lock:
+            return crew.kickoff()
+    finally:
+        shared_store.observe('agent.task_seconds', time.perf_counter() - start)
+
+@app.route('/cache', methods=['GET'])
+def cache_stats():
+    """Statistiky cache podobných úkolů"""
+    if similarity_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **similarity_cache.stats()})
+
+@app.route('/sessions', methods=['GET'])
+def sessions_stats():
+    """Přehled relací a jejich limitů"""
+    return jsonify(sessions.stats())
+
+@app.route('/sessions/<session_id>', methods=['GET'])
+def session_info(session_id):
+    """Stav jedné relace"""
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({'success': False, 'error': 'Unknown session'}), 404
+    return jsonify({'success': True, 'session': session.to_dict()})
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def session_delete(session_id):
+    """Ukončí relaci a zahodí její historii"""
+    if not sessions.delete(session_id):
+        return jsonify({'success': False, 'error': 'Unknown session'}), 404
+    return jsonify({'success': True})
+
 if __name__ == '__main__':
     print("🚀 CrewAI API Server starting on http://localhost:5005")
     print("📝 Endpoints:")
     print("   GET  /health - Health check")
     print("   GET  /agents - List available agents")
-    print("   POST /crewai - Run full crew")
-    print("   POST /agent/task - Run single agent")
+    print("   POST /crewai - Run full crew (optional trace)")
+    print("   GET  /runs/<id>/trace - Download run trace")
+    print("   GET  /jobs/<id> - Async job status")
+    print("   GET  /metrics - Shared metrics")
+    print("   POST /agent/task - Run single agent (optional session_id)")
+    print("   GET  /cache - Similarity cache stats")
+    print("   GET  /sessions/<id> - Session info")
+    print("   DELETE /sessions/<id> - Drop session")
+    print("ℹ️  Vývojový server - pro produkci: python python/crewai_serve.py")
+    # Frontu úloh zpracovává jen proces spuštěný reloaderem, ne hlídací rodič
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_job_runner()
     app.run(port=5005, host='0.0.0.0', debug=True)
@@ -0,0 +1,117 @@
+"""
+Produkční server CrewAI API
+Spustí několik workerů (gunicorn, --preload: agenti se vytvoří jednou v masteru
+a workery je zdědí forkem). Spadlý worker gunicorn hned nahradí, jeho
+rozběhnuté úlohy po vypršení heartbeatu převezme jiný worker ze sdílené
+SQLite fronty (crewai_store.py).
+
+Dimenzování:
+    workers = počet Ollama backendů × OLLAMA_NUM_PARALLEL
+Jeden worker zpracovává jednu úlohu (posádku) naráz - agenti jsou sdílení
+procesem, takže posádky z HTTP vláken i z fronty čekají na crewai_api.crew_lock.
+Posádka volá LLM sekvenčně, víc workerů než volných slotů Ollamy by jen čekalo
+ve frontě Ollamy. HTTP vlákna (--threads) obsluhují dotazy na stav a krátké
+požadavky, zatímco běží dlouhá úloha.
+
+Windows (bez gunicornu) spustí jeden proces přes waitress.
+"""
+import argparse
+import os
+import sys
+
+DEFAULT_BACKEND = 'http://localhost:11434/v1'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Produkční server CrewAI API')
+    parser.add_argument('--bind', default=os.environ.get('CREWAI_BIND', '0.0.0.0:5005'))
+    parser.add_argument('--backends', default=os.environ.get('CREWAI_OLLAMA_BACKENDS', DEFAULT_BACKEND),
+                        help='čárkou oddělené OpenAI-kompatibilní URL Ollama backendů')
+    parser.add_argument('--ollama-parallel', type=int,
+                        default=int(os.environ.get('OLLAMA_NUM_PARALLEL', 1)),
+                        help='souběžných požadavků na jeden backend (OLLAMA_NUM_PARALLEL)')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('CREWAI_WORKERS', 0)),
+                        help='počet workerů (výchozí: backendy × ollama-parallel)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('CREWAI_THREADS', 4)),
+                        help='HTTP vláken na worker')
+    parser.add_argument('--job-threads', type=int, default=int(os.environ.get('CREWAI_JOB_THREADS', 1)),
+                        help='vláken fronty úloh na worker')
+    parser.add_argument('--timeout', type=int, default=int(os.environ.get('CREWAI_TIMEOUT', 900)),
+                        help='max. délka synchronního požadavku v sekundách')
+    return parser.parse_args()
+
+
+def size_workers(backends, ollama_parallel, requested=0):
+    """Počet workerů: explicitní hodnota, jinak jeden na každý slot Ollamy"""
+    if requested > 0:
+        return requested
+    return max(1, len(backends) * max(1, ollama_parallel))
+
+
+def backend_for(index, backends):
+    """Workery se rozdělí mezi backendy rovnoměrně (round-robin)"""
+    return backends[index % len(backends)]
+
+
+def run_gunicorn(args, backends, workers):
+    from gunicorn.app.base import BaseApplication
+
+    def post_fork(server, worker):
+        import crewai_api
+        backend = backend_for(worker.age, backends)
+        crewai_api.configure_backend(backend)
+        crewai_api.start_job_runner(args.job_threads)
+        server.log.info('Worker %s -> %s', worker.pid, backend)
+
+    class CrewAIApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': args.bind,
+                'workers': workers,
+                'worker_class': 'gthread',
+                'threads': args.threads,
+                'timeout': args.timeout,
+                'graceful_timeout': 30,
+                'preload_app': True,
+                'post_fork': post_fork,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            import crewai_api
+            return crewai_api.app
+
+    CrewAIApplication().run()
+
+
+def run_waitress(args, backends):
+    from waitress import serve
+    import crewai_api
+
+    print('⚠️  gunicorn není k dispozici (Windows) - běží jeden proces přes waitress')
+    crewai_api.configure_backend(backends[0])
+    crewai_api.start_job_runner(args.job_threads)
+    host, _, port = args.bind.rpartition(':')
+    serve(crewai_api.app, host=host or '0.0.0.0', port=int(port), threads=args.threads)
+
+
+def main():
+    args = parse_args()
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    workers = size_workers(backends, args.ollama_parallel, args.workers)
+
+    print(f"🚀 CrewAI API (produkce) na {args.bind}")
+    print(f"   Backendy: {', '.join(backends)}")
+    print(f"   Workery: {workers} × {args.threads} HTTP vláken, {args.job_threads} vlákno fronty")
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        run_waitress(args, backends)
+    else:
+        run_gunicorn(args, backends, workers)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
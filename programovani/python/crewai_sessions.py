@@ -0,0 +1,236 @@
+"""
+Serverové relace pro /agent/task
+Drží historii konverzace na serveru, takže frontend u navazujících dotazů
+posílá jen nový úkol místo celého kódu a historie.
+
+Prompt se skládá vždy ve stejném pořadí:
+    kontext relace -> shrnutí starší konverzace -> předchozí kroky -> nový úkol
+Mezi kompakcemi se k němu jen přidává na konec, takže začátek promptu
+zůstává beze změny a Ollama může znovu použít svou prompt cache (KV prefix).
+
+S předaným `shared` (crewai_store.SharedStore) se relace ukládají do SQLite
+a navazující dotaz může obsloužit kterýkoli worker.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Výchozí limity (lze přepsat v konstruktoru SessionStore)
+DEFAULT_TOKEN_BUDGET = 6000      # max. odhadovaných tokenů historie v promptu (bez kontextu)
+DEFAULT_MAX_TURNS = 20           # max. počet kroků držených v plném znění
+DEFAULT_MAX_SESSIONS = 200       # max. počet současně držených relací (LRU)
+DEFAULT_TTL = 60 * 60            # nečinná relace vyprší po hodině
+COMPACT_RATIO = 0.5              # kompakce ořízne historii na polovinu limitu
+
+
+def estimate_tokens(text):
+    """Hrubý odhad počtu tokenů (~4 znaky na token)"""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def _first_line(text, limit):
+    line = (text or '').strip().split('\n', 1)[0].strip()
+    return line if len(line) <= limit else line[:limit - 1] + '…'
+
+
+def summarize_turn(task, result):
+    """Výchozí extraktivní shrnutí jednoho kroku (bez volání LLM)"""
+    return f"- Úkol: {_first_line(task, 160)} → {_first_line(result, 240)}"
+
+
+class Session:
+    """Jedna konverzace s agentem"""
+
+    def __init__(self, session_id, agent_id, context=''):
+        self.id = session_id
+        self.agent_id = agent_id
+        self.context = context or ''
+        self.summary = []        # shrnutí vyřazených kroků (jen přibývá)
+        self.turns = []          # [(task, result), ...] v plném znění
+        self.created = time.time()
+        self.last_used = self.created
+        self.compactions = 0
+        self.version = 0
+        # Navazující dotazy stejné relace se zpracují postupně
+        self.lock = threading.Lock()
+
+    def history_tokens(self):
+        return estimate_tokens(self.context) + self.conversation_tokens()
+
+    def conversation_tokens(self):
+        """Tokeny shrnutí a kroků - jen ty se vejdou do token_budget, kontext je pevný"""
+        tokens = sum(estimate_tokens(line) for line in self.summary)
+        tokens += sum(estimate_tokens(t) + estimate_tokens(r) for t, r in self.turns)
+        return tokens
+
+    def render_prompt(self, task):
+        """Sestaví popis úkolu pro CrewAI; stabilní části jsou vždy na začátku"""
+        parts = []
+        if self.context:
+            parts.append(f"[Kontext relace]\n{self.context}")
+        if self.summary:
+            parts.append("[Shrnutí starší konverzace]\n" + '\n'.join(self.summary))
+        if self.turns:
+            steps = '\n\n'.join(f"Uživatel: {t}\nAgent: {r}" for t, r in self.turns)
+            parts.append(f"[Předchozí kroky]\n{steps}")
+        if not parts:
+            return task
+        parts.append(f"[Aktuální úkol]\n{task}")
+        return '\n\n'.join(parts)
+
+    def to_state(self):
+        return {
+            'agent_id': self.agent_id,
+            'context': self.context,
+            'summary': self.summary,
+            'turns': self.turns,
+            'created': self.created,
+            'last_used': self.last_used,
+            'compactions': self.compactions,
+            'version': self.version
+        }
+
+    def load_state(self, state):
+        self.agent_id = state['agent_id']
+        self.context = state['context']
+        self.summary = list(state['summary'])
+        self.turns = [tuple(turn) for turn in state['turns']]
+        self.created = state['created']
+        self.last_used = state['last_used']
+        self.compactions = state['compactions']
+        self.version = state['version']
+
+    def to_dict(self):
+        return {
+            'session_id': self.id,
+            'agent_id': self.agent_id,
+            'turns': len(self.turns),
+            'summarized_turns': len(self.summary),
+            'compactions': self.compactions,
+            'estimated_tokens': self.history_tokens(),
+            'created': self.created,
+            'last_used': self.last_used
+        }
+
+
+class SessionStore:
+    """Thread-safe úložiště relací s LRU vyřazováním a expirací"""
+
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, max_turns=DEFAULT_MAX_TURNS,
+                 max_sessions=DEFAULT_MAX_SESSIONS, ttl=DEFAULT_TTL, summarizer=summarize_turn,
+                 shared=None):
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.summarizer = summarizer
+        self.shared = shared
+        # Bez sdíleného úložiště jediné místo relací, jinak jen lokální kopie (kvůli zámkům)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        expired = [sid for sid, s in self._sessions.items() if now - s.last_used > self.ttl]
+        for sid in expired:
+            del self._sessions[sid]
+        if self.shared is not None:
+            self.shared.expire_sessions(now - self.ttl)
+
+    def _load(self, session_id):
+        # Volá se pod self._lock; ve sdíleném režimu má přednost stav z SQLite
+        session = self._sessions.get(session_id)
+        if self.shared is None:
+            return session
+        state = self.shared.load_session(session_id)
+        if state is None:
+            self._sessions.pop(session_id, None)
+            return None
+        if session is None:
+            session = self._sessions[session_id] = Session(session_id, state['agent_id'])
+        if session.version != state['version']:
+            session.load_state(state)
+        return session
+
+    def _save(self, session):
+        if self.shared is not None:
+            self.shared.save_session(session.id, session.to_state())
+
+    def get(self, session_id):
+        with self._lock:
+            self._expire(time.time())
+            return self._load(session_id)
+
+    def get_or_create(self, session_id, agent_id, context='', create=True):
+        """Vrátí (session, created). Bez session_id založí novou relaci,
+        neznámé (třeba vypršelé) session_id jen s create=True, jinak (None, False)."""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._load(session_id) if session_id else None
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(session.id)
+                return session, False
+            if session_id and not create:
+                return None, False
+
+            session = Session(session_id or uuid.uuid4().hex, agent_id, context)
+            self._sessions[session.id] = session
+            # Ve sdíleném režimu se vyřadí jen lokální kopie - relaci může
+            # používat jiný worker, ze SQLite ji odstraní až expirace (ttl)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            self._save(session)
+            return session, True
+
+    def delete(self, session_id):
+        with self._lock:
+            removed = self._sessions.pop(session_id, None) is not None
+            if self.shared is not None:
+                removed = self.shared.delete_session(session_id) or removed
+            return removed
+
+    def record_turn(self, session, task, result):
+        """Uloží dokončený krok a při překročení limitů zkompaktuje historii"""
+        session.turns.append((task, result))
+        session.last_used = time.time()
+        # Kontext relace se nekompaktuje, takže se do limitu nepočítá - jinak
+        # by velký kód kompakci spouštěl po každém kroku a zahodil celou historii
+        if (session.conversation_tokens() > self.token_budget
+                or len(session.turns) > self.max_turns):
+            self._compact(session)
+        session.version += 1
+        self._save(session)
+
+    def _compact(self, session):
+        # Vyřazuje se po dávkách až pod COMPACT_RATIO limitu - prompt se tak
+        # mění jen při kompakci, ne při každém kroku (klouzavé okno by
+        # rozbíjelo prompt cache Ollamy v každém kole).
+        # Cíl se měří jen na krocích, které zůstávají v plném znění (shrnutí má
+        # vlastní limit níže) a poslední krok zůstane vždy.
+        target_tokens = int(self.token_budget * COMPACT_RATIO)
+        target_turns = max(1, int(self.max_turns * COMPACT_RATIO))
+        turn_tokens = sum(estimate_tokens(t) + estimate_tokens(r) for t, r in session.turns)
+        while len(session.turns) > 1 and (turn_tokens > target_tokens
+                                          or len(session.turns) > target_turns):
+            task, result = session.turns.pop(0)
+            turn_tokens -= estimate_tokens(task) + estimate_tokens(result)
+            session.summary.append(self.summarizer(task, result))
+
+        # Samotné shrnutí nesmí přerůst čtvrtinu limitu - nejstarší řádky zahodíme
+        summary_budget = self.token_budget // 4
+        while len(session.summary) > 1 and sum(
+                estimate_tokens(line) for line in session.summary) > summary_budget:
+            session.summary.pop(0)
+        session.compactions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': self.shared.count_sessions() if self.shared is not None else len(self._sessions),
+                'token_budget': self.token_budget,
+                'max_turns': self.max_turns,
+                'max_sessions': self.max_sessions,
+                'ttl': self.ttl
+            }
@@ -0,0 +1,157 @@
+"""
+Cache téměř shodných odpovědí pro /agent/task
+Úkoly se lokálně převedou na MinHash podpis (slovní n-gramy, bez externí
+služby) a indexují se pomocí LSH pásem, takže vyhledání zůstává rychlé
+i při 100k záznamech - porovnávají se jen kandidáti ze stejných košů.
+
+S předaným `shared` (crewai_store.SharedStore) se záznamy ukládají i do SQLite
+a každý worker si před vyhledáním dotáhne záznamy přidané ostatními.
+"""
+import hashlib
+import random
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+NUM_PERM = 64                    # délka MinHash podpisu
+BANDS = 16                       # LSH pásma (BANDS * ROWS == NUM_PERM)
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3                 # slovní n-gramy
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_MAX_ENTRIES = 100_000
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1729)       # pevné semínko -> stejné podpisy ve všech procesech
+_PERMS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+_TOKEN_RE = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def shingles(text):
+    """Normalizované slovní n-gramy - bílé znaky a velikost písmen se ignorují"""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) <= SHINGLE_SIZE:
+        return {' '.join(tokens)}
+    return {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def signature(text):
+    """MinHash podpis textu (array NUM_PERM čísel)"""
+    hashes = [_hash64(s) for s in shingles(text)]
+    return array('Q', (
+        min(((a * h + b) % _MERSENNE) & _MAX_HASH for h in hashes)
+        for a, b in _PERMS
+    ))
+
+
+def similarity(sig_a, sig_b):
+    """Odhad Jaccardovy podobnosti ze dvou podpisů"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _band_keys(scope, sig):
+    return [(scope, i, tuple(sig[i * ROWS:(i + 1) * ROWS])) for i in range(BANDS)]
+
+
+class SimilarityCache:
+    """Thread-safe LRU cache odpovědí vyhledávaných podle podobnosti úkolu"""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES, shared=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.shared = shared
+        self._synced_id = 0
+        self._entries = OrderedDict()    # id -> (scope, sig, answer, text_key)
+        self._buckets = {}               # band key -> set(id)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.approximate_hits = 0
+        self.misses = 0
+
+    def lookup(self, scope, text):
+        """Vrátí (answer, similarity, exact) nejpodobnějšího záznamu nad prahem, jinak None"""
+        sig = signature(text)
+        text_key = _hash64(text)
+        self._sync()
+        with self._lock:
+            candidates = set()
+            for key in _band_keys(scope, sig):
+                candidates.update(self._buckets.get(key, ()))
+
+            best_id, best_score = None, 0.0
+            for entry_id in candidates:
+                score = similarity(sig, self._entries[entry_id][1])
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            _, _, answer, stored_key = self._entries[best_id]
+            exact = stored_key == text_key
+            self.hits += 1
+            if not exact:
+                self.approximate_hits += 1
+            return answer, best_score, exact
+
+    def store(self, scope, text, answer):
+        sig = signature(text)
+        text_key = _hash64(text)
+        if self.shared is not None:
+            entry_id = self.shared.add_similar(scope, sig.tobytes(), f'{text_key:016x}',
+                                              answer, self.max_entries)
+        else:
+            with self._lock:
+                entry_id = self._next_id
+                self._next_id += 1
+        with self._lock:
+            self._insert(entry_id, scope, sig, answer, text_key)
+
+    def _sync(self):
+        # Dotáhne záznamy, které mezitím uložily ostatní workery
+        if self.shared is None:
+            return
+        rows = self.shared.similar_since(self._synced_id, self.max_entries)
+        with self._lock:
+            for entry_id, scope, sig_bytes, text_key, answer in rows:
+                if entry_id not in self._entries:
+                    sig = array('Q')
+                    sig.frombytes(sig_bytes)
+                    self._insert(entry_id, scope, sig, answer, int(text_key, 16))
+                self._synced_id = max(self._synced_id, entry_id)
+
+    def _insert(self, entry_id, scope, sig, answer, text_key):
+        # Volá se pod self._lock
+        self._entries[entry_id] = (scope, sig, answer, text_key)
+        for key in _band_keys(scope, sig):
+            self._buckets.setdefault(key, set()).add(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        entry_id, (scope, sig, _, _) = self._entries.popitem(last=False)
+        for key in _band_keys(scope, sig):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'approximate_hits': self.approximate_hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,260 @@
+"""
+Sdílený lokální stav CrewAI API (SQLite)
+Všechny workery produkčního serveru (crewai_serve.py) čtou a zapisují stejnou
+databázi, takže stav úlohy, uložené výsledky, relace i metriky zodpoví
+kterýkoli worker. SQLite běží v režimu WAL - čtení neblokuje zápisy.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent / 'data' / 'crewai.sqlite3'
+HEARTBEAT_INTERVAL = 10          # s - jak často běžící úloha hlásí, že žije
+STALE_AFTER = 60                 # s - úloha bez heartbeatu se považuje za osiřelou
+MAX_ATTEMPTS = 2                 # kolikrát se úloha po pádu workeru zkusí znovu
+METRICS_FLUSH_INTERVAL = 5       # s - jak často se zapíšou metriky nasbírané v paměti
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,            -- queued | running | done | failed
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    heartbeat REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS similar (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    text_key TEXT NOT NULL,
+    answer TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    name TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0,
+    total REAL NOT NULL DEFAULT 0,
+    max REAL NOT NULL DEFAULT 0
+);
+"""
+
+_UPSERT_METRIC = """INSERT INTO metrics (name, count, total, max) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET count = count + excluded.count,
+                    total = total + excluded.total, max = MAX(max, excluded.max)"""
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class SharedStore:
+    """Tenká vrstva nad SQLite; každé vlákno (a proces po forku) má vlastní spojení
+
+    Databáze se vytvoří až při prvním dotazu - samotný import crewai_api
+    (testy, nástroje, gunicorn master s --preload) nic nezakládá.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        # Metriky požadavků se sčítají v paměti a zapisují dávkově (observe(buffered=True))
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flushed = time.time()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        # Po forku (gunicorn --preload) nesmí worker použít spojení rodiče
+        if conn is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._ensure_schema(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _ensure_schema(self, conn):
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(_SCHEMA)
+                self._schema_ready = True
+
+    def _tx(self):
+        return _Transaction(self._conn())
+
+    # --- Úlohy ---
+
+    def create_job(self, kind, payload):
+        job_id = uuid.uuid4().hex
+        with self._tx() as db:
+            db.execute('INSERT INTO jobs (id, kind, status, payload, created) VALUES (?, ?, ?, ?, ?)',
+                       (job_id, kind, 'queued', json.dumps(payload, ensure_ascii=False), time.time()))
+        return job_id
+
+    def claim_job(self):
+        """Atomicky převezme nejstarší čekající úlohu, None pokud žádná není"""
+        now = time.time()
+        with self._tx() as db:
+            row = db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1").fetchone()
+            if row is None:
+                return None
+            db.execute("""UPDATE jobs SET status = 'running', worker = ?, started = ?, heartbeat = ?,
+                          attempts = attempts + 1 WHERE id = ?""", (worker_name(), now, now, row['id']))
+            job = db.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+        return _job_dict(job)
+
+    def heartbeat(self, job_id):
+        with self._tx() as db:
+            db.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = 'running' AND worker = ?",
+                       (time.time(), job_id, worker_name()))
+
+    def finish_job(self, job_id, result=None, error=None):
+        """Uloží výsledek; False, pokud úlohu mezitím převzal jiný worker (nebo ji recovery ukončila)"""
+        with self._tx() as db:
+            return db.execute("""UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?
+                                 WHERE id = ? AND status = 'running' AND worker = ?""",
+                              ('failed' if error else 'done', result, error, time.time(),
+                               job_id, worker_name())).rowcount > 0
+
+    def get_job(self, job_id):
+        with self._tx() as db:
+            row = db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return _job_dict(row) if row else None
+
+    def recover_stale_jobs(self, stale_after=STALE_AFTER, max_attempts=MAX_ATTEMPTS):
+        """Úlohy workerů, které spadly uprostřed běhu, vrátí do fronty (nebo označí za chybné)"""
+        limit = time.time() - stale_after
+        with self._tx() as db:
+            requeued = db.execute("""UPDATE jobs SET status = 'queued', worker = NULL
+                                     WHERE status = 'running' AND heartbeat < ? AND attempts < ?""",
+                                  (limit, max_attempts)).rowcount
+            failed = db.execute("""UPDATE jobs SET status = 'failed', finished = ?,
+                                   error = 'Worker crashed during run'
+                                   WHERE status = 'running' AND heartbeat < ?""",
+                                (time.time(), limit)).rowcount
+        return requeued, failed
+
+    def job_counts(self):
+        with self._tx() as db:
+            rows = db.execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status').fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    # --- Relace (crewai_sessions) ---
+
+    def load_session(self, session_id):
+        with self._tx() as db:
+            row = db.execute('SELECT state FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        return json.loads(row['state']) if row else None
+
+    def save_session(self, session_id, state):
+        with self._tx() as db:
+            db.execute('INSERT OR REPLACE INTO sessions (id, state, last_used) VALUES (?, ?, ?)',
+                       (session_id, json.dumps(state, ensure_ascii=False), state['last_used']))
+
+    def delete_session(self, session_id):
+        with self._tx() as db:
+            return db.execute('DELETE FROM sessions WHERE id = ?', (session_id,)).rowcount > 0
+
+    def expire_sessions(self, older_than):
+        with self._tx() as db:
+            db.execute('DELETE FROM sessions WHERE last_used < ?', (older_than,))
+
+    def count_sessions(self):
+        with self._tx() as db:
+            return db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    # --- Cache podobných úkolů (crewai_similarity_cache) ---
+
+    def add_similar(self, scope, signature, text_key, answer, max_entries):
+        with self._tx() as db:
+            entry_id = db.execute('INSERT INTO similar (scope, signature, text_key, answer) VALUES (?, ?, ?, ?)',
+                                  (scope, signature, text_key, answer)).lastrowid
+            db.execute('DELETE FROM similar WHERE id <= ?', (entry_id - max_entries,))
+        return entry_id
+
+    def similar_since(self, last_id, limit):
+        """Záznamy přidané jinými workery od last_id (nejvýše posledních `limit`)"""
+        with self._tx() as db:
+            rows = db.execute("""SELECT * FROM (SELECT id, scope, signature, text_key, answer FROM similar
+                                 WHERE id > ? ORDER BY id DESC LIMIT ?) ORDER BY id""",
+                              (last_id, limit)).fetchall()
+        return [tuple(row) for row in rows]
+
+    # --- Metriky ---
+
+    def observe(self, name, value=1.0, buffered=False):
+        """Započítá jeden výskyt (a u časů jejich součet a maximum)
+
+        S buffered=True se jen přičte v paměti; do SQLite se dávka zapíše
+        nejvýše jednou za METRICS_FLUSH_INTERVAL (nebo při flush_metrics).
+        """
+        if not buffered:
+            with self._tx() as db:
+                db.execute(_UPSERT_METRIC, (name, 1, value, value))
+            return
+        with self._pending_lock:
+            count, total, peak = self._pending.get(name, (0, 0.0, value))
+            self._pending[name] = (count + 1, total + value, max(peak, value))
+            due = time.time() - self._flushed >= METRICS_FLUSH_INTERVAL
+        if due:
+            self.flush_metrics()
+
+    def flush_metrics(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = time.time()
+        if pending:
+            with self._tx() as db:
+                db.executemany(_UPSERT_METRIC, [(name, *values) for name, values in pending.items()])
+
+    def metrics(self):
+        self.flush_metrics()
+        with self._tx() as db:
+            rows = db.execute('SELECT * FROM metrics ORDER BY name').fetchall()
+        return {row['name']: {'count': row['count'], 'total': round(row['total'], 3),
+                              'avg': round(row['total'] / row['count'], 3) if row['count'] else 0,
+                              'max': round(row['max'], 3)} for row in rows}
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT - zápis zamkne DB hned, takže claim_job je atomický"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+def _job_dict(row):
+    job = dict(row)
+    job['payload'] = json.loads(job['payload'])
+    return job
@@ -0,0 +1,282 @@
+"""
+Trasování jednotlivých běhů /crewai
+Každý běh zapíše strom spanů do JSON souboru ve formátu Chrome trace-event
+(otevřít v chrome://tracing nebo https://ui.perfetto.dev jako flame chart).
+
+Vlákna v trace:
+    tid 1 "crew"  - celý běh, jednotlivé úkoly, prodlevy (idle)
+    tid 2 "llm"   - LLM volání a použití nástrojů (delegace, opakování)
+    tid 10+       - kroky jednotlivých agentů (step_callback)
+"""
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+TRACE_DIR = Path(__file__).resolve().parent / 'traces'
+DEFAULT_KEEP = 100               # kolik posledních trace souborů ponechat
+IDLE_MIN_US = 50_000             # kratší mezery se jako idle nezapisují
+
+TID_CREW = 1
+TID_LLM = 2
+_AGENT_TID_BASE = 10
+
+_RUN_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+_DELEGATION_TOOLS = ('delegate work to coworker', 'ask question to coworker')
+
+# Aktivní tracer běhu. ContextVar, ne threading.local: event bus CrewAI volá
+# synchronní handlery ve vlastním thread poolu přes contextvars.copy_context()
+_current = contextvars.ContextVar('crewai_tracer', default=None)
+_event_bus = None                # crewai_event_bus, pokud se handlery zaregistrovaly
+
+
+def new_run_id():
+    return uuid.uuid4().hex
+
+
+def trace_path(run_id, directory=TRACE_DIR):
+    """Cesta k trace souboru, None pro neplatné run_id"""
+    if not _RUN_ID_RE.match(run_id or ''):
+        return None
+    return Path(directory) / f'{run_id}.json'
+
+
+def current_tracer():
+    return _current.get()
+
+
+class RunTracer:
+    """Sběr událostí jednoho běhu crew"""
+
+    def __init__(self, run_id, tasks=(), metadata=None):
+        self.run_id = run_id
+        self.metadata = metadata or {}
+        # Pořadí úkolů (popis, role agenta) - sekvenční proces je plní postupně
+        self.tasks = [(t.description, t.agent.role if t.agent else '') for t in tasks]
+        self._task_index = 0
+        self._events = []
+        self._threads = {'crew': TID_CREW, 'llm': TID_LLM}
+        self._open = {}              # klíč -> (name, cat, ts, tid, args) otevřených spanů
+        self._work = []              # (start, end) LLM/nástrojů pro výpočet prodlev
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._run_start = 0
+        self._task_start = 0
+        self._agent_marks = {}
+        self._token = None
+
+    def _now(self):
+        return int((time.perf_counter() - self._t0) * 1_000_000)
+
+    def _agent_tid(self, role):
+        name = f'agent: {role}'
+        if name not in self._threads:
+            self._threads[name] = _AGENT_TID_BASE + len(self._threads)
+        return self._threads[name]
+
+    def _complete(self, name, cat, ts, dur, tid, args=None):
+        self._events.append({
+            'name': name, 'cat': cat, 'ph': 'X', 'ts': ts, 'dur': max(dur, 1),
+            'pid': 1, 'tid': tid, 'args': args or {}
+        })
+
+    def instant(self, name, cat, tid=TID_LLM, args=None):
+        with self._lock:
+            self._events.append({
+                'name': name, 'cat': cat, 'ph': 'i', 's': 't', 'ts': self._now(),
+                'pid': 1, 'tid': tid, 'args': args or {}
+            })
+
+    def begin(self, key, name, cat, tid=TID_LLM, args=None):
+        with self._lock:
+            self._open[key] = (name, cat, self._now(), tid, args or {})
+
+    def end(self, key, args=None):
+        with self._lock:
+            opened = self._open.pop(key, None)
+            if opened is None:
+                return
+            name, cat, ts, tid, start_args = opened
+            now = self._now()
+            self._complete(name, cat, ts, now - ts, tid, {**start_args, **(args or {})})
+            if tid == TID_LLM:
+                self._work.append((ts, now))
+
+    def current_agent(self):
+        if self._task_index < len(self.tasks):
+            return self.tasks[self._task_index][1]
+        return ''
+
+    # --- Callbacky pro Crew(step_callback=..., task_callback=...) ---
+
+    def on_step(self, step):
+        """Jeden krok agenta (myšlenka + akce/nástroj nebo finální odpověď)"""
+        role = self.current_agent()
+        tool = getattr(step, 'tool', None) or ''
+        args = {'tool': tool} if tool else {'final': True}
+        name = 'step'
+        if tool.strip().lower() in _DELEGATION_TOOLS:
+            name = 'delegation'
+            args['tool_input'] = str(getattr(step, 'tool_input', ''))[:200]
+        elif tool == '_Exception':
+            # CrewAI takto hlásí neplatný formát odpovědi LLM -> další pokus
+            name = 'retry'
+        with self._lock:
+            now = self._now()
+            start = max(self._agent_marks.get(role, self._task_start), self._task_start)
+            self._complete(name, 'agent', start, now - start, self._agent_tid(role), args)
+            self._agent_marks[role] = now
+
+    def on_task(self, output):
+        """Dokončený úkol - span od konce předchozího úkolu"""
+        with self._lock:
+            now = self._now()
+            description, role = (self.tasks[self._task_index]
+                                 if self._task_index < len(self.tasks) else ('', ''))
+            role = getattr(output, 'agent', None) or role
+            self._complete(f'task: {role}', 'task', self._task_start, now - self._task_start,
+                           TID_CREW, {'description': description[:200]})
+            self._task_index += 1
+            self._task_start = now
+
+    # --- Životní cyklus běhu ---
+
+    def __enter__(self):
+        self._run_start = self._task_start = self._now()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        if _event_bus is not None:
+            _event_bus.flush()       # handlery běží asynchronně - dopsat spany před uzavřením běhu
+        with self._lock:
+            now = self._now()
+            args = dict(self.metadata)
+            if exc is not None:
+                args['error'] = str(exc)
+            self._complete('crew run', 'run', self._run_start, now - self._run_start, TID_CREW, args)
+            self._add_idle(self._run_start, now)
+        return False
+
+    def _add_idle(self, start, end):
+        # Prodlevy = čas běhu, kdy neběželo žádné LLM volání ani nástroj
+        if not self._work:
+            return
+        cursor = start
+        for ws, we in sorted(self._work):
+            if ws - cursor >= IDLE_MIN_US:
+                self._complete('idle', 'idle', cursor, ws - cursor, TID_LLM)
+            cursor = max(cursor, we)
+        if end - cursor >= IDLE_MIN_US:
+            self._complete('idle', 'idle', cursor, end - cursor, TID_LLM)
+
+    def to_chrome(self):
+        meta = [{'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 0,
+                 'args': {'name': f'crew run {self.run_id}'}}]
+        meta += [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': name}}
+                 for name, tid in self._threads.items()]
+        # Delší spany dřív - prohlížeče pak správně vnoří stejné časy
+        events = sorted(self._events, key=lambda e: (e['ts'], -e.get('dur', 0)))
+        return {
+            'traceEvents': meta + events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'run_id': self.run_id, **self.metadata}
+        }
+
+    def save(self, directory=TRACE_DIR, keep=DEFAULT_KEEP):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = trace_path(self.run_id, directory)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.to_chrome(), ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, path)
+        _prune(directory, keep)
+        return path
+
+
+def _prune(directory, keep):
+    files = sorted(directory.glob('*.json'), key=lambda p: p.stat().st_mtime)
+    for old in files[:-keep] if keep else []:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+def _register_event_bus():
+    """Přesné LLM/nástroj spany přes event bus CrewAI (novější verze), jinak nic"""
+    try:
+        try:
+            from crewai.events import (crewai_event_bus, LLMCallStartedEvent,
+                                       LLMCallCompletedEvent, LLMCallFailedEvent,
+                                       ToolUsageStartedEvent, ToolUsageFinishedEvent,
+                                       ToolUsageErrorEvent)
+        except ImportError:
+            from crewai.utilities.events import (crewai_event_bus, LLMCallStartedEvent,
+                                                 LLMCallCompletedEvent, LLMCallFailedEvent,
+                                                 ToolUsageStartedEvent, ToolUsageFinishedEvent,
+                                                 ToolUsageErrorEvent)
+    except ImportError:
+        return False
+    global _event_bus
+    if hasattr(crewai_event_bus, 'flush'):
+        _event_bus = crewai_event_bus
+
+    def _llm_key(event):
+        return ('llm', getattr(event, 'agent_role', None) or '')
+
+    def _tool_key(event):
+        return ('tool', getattr(event, 'agent_role', None) or '', getattr(event, 'tool_name', ''))
+
+    @crewai_event_bus.on(LLMCallStartedEvent)
+    def _llm_started(source, event):
+        tracer = current_tracer()
+        if tracer:
+            role = getattr(event, 'agent_role', None) or tracer.current_agent()
+            tracer.begin(_llm_key(event), f'llm: {role}', 'llm',
+                         args={'model': str(getattr(event, 'model', '') or '')})
+
+    @crewai_event_bus.on(LLMCallCompletedEvent)
+    def _llm_completed(source, event):
+        tracer = current_tracer()
+        if tracer:
+            tracer.end(_llm_key(event))
+
+    @crewai_event_bus.on(LLMCallFailedEvent)
+    def _llm_failed(source, event):
+        tracer = current_tracer()
+        if tracer:
+            tracer.end(_llm_key(event), {'error': str(getattr(event, 'error', ''))})
+            tracer.instant('retry', 'llm', args={'reason': 'llm call failed'})
+
+    @crewai_event_bus.on(ToolUsageStartedEvent)
+    def _tool_started(source, event):
+        tracer = current_tracer()
+        if tracer:
+            tool = getattr(event, 'tool_name', '')
+            cat = 'delegation' if tool.strip().lower() in _DELEGATION_TOOLS else 'tool'
+            tracer.begin(_tool_key(event), f'{cat}: {tool}', cat,
+                         args={'agent': getattr(event, 'agent_role', '')})
+
+    @crewai_event_bus.on(ToolUsageFinishedEvent)
+    def _tool_finished(source, event):
+        tracer = current_tracer()
+        if tracer:
+            tracer.end(_tool_key(event))
+
+    @crewai_event_bus.on(ToolUsageErrorEvent)
+    def _tool_error(source, event):
+        tracer = current_tracer()
+        if tracer:
+            tracer.end(_tool_key(event), {'error': str(getattr(event, 'error', ''))})
+            tracer.instant('retry', 'tool', args={'tool': getattr(event, 'tool_name', '')})
+
+    return True
+
+
+EVENT_BUS_AVAILABLE = _register_event_bus()
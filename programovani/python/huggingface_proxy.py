@@ -2,21 +2,454 @@
 HuggingFace Proxy Server
 Řeší CORS problém při volání HuggingFace API z browseru
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import requests
+import hashlib
+import json
 import os
+import threading
+import time
 
 app = Flask(__name__)
-CORS(app)  # Povolí všechny CORS requesty
+# Povolí všechny CORS requesty; X-Proxy-* hlavičky musí být čitelné i z browseru
+CORS(app, expose_headers=['X-Proxy-Model', 'X-Proxy-Hedged', 'X-Proxy-Hedge-Rate', 'Retry-After'])
 
 # Port pro proxy server
 PORT = 5010
 
+HF_API_BASE = 'https://api-inference.huggingface.co/models'
+REQUEST_TIMEOUT = 90
+
+# Hedging (volitelný): když primární model do HF_HEDGE_AFTER sekund nepošle první bajt,
+# stejný dotaz se pošle i na HF_HEDGE_MODEL a vrátí se odpověď, která přijde dřív.
+# Per-request lze sekundární model zadat hlavičkou X-Hedge-Model.
+HEDGE_MODEL = os.environ.get('HF_HEDGE_MODEL')
+HEDGE_AFTER = float(os.environ.get('HF_HEDGE_AFTER', 10))
+# HF_HEDGE_ADAPTIVE=1: práh = p90 doby do prvního bajtu daného modelu (v mezích MIN_AFTER..AFTER)
+HEDGE_ADAPTIVE = os.environ.get('HF_HEDGE_ADAPTIVE', '0') == '1'
+HEDGE_MIN_AFTER = float(os.environ.get('HF_HEDGE_MIN_AFTER', 1))
+HEDGE_MIN_SAMPLES = 20
+
+# Registr promptů: klient prompt jednou zaregistruje (POST /prompts) a v messages
+# pak posílá jen {"role": "system", "prompt_id": "sha256:..."}; proxy ho před
+# přeposláním rozbalí. Nejdéle nepoužité prompty se vyhazují (LRU).
+PROMPT_STORE_MAX_BYTES = int(os.environ.get('HF_PROMPT_STORE_BYTES', 32 * 1024 * 1024))
+PROMPT_STORE_MAX_ENTRIES = int(os.environ.get('HF_PROMPT_STORE_ENTRIES', 2000))
+
+# Circuit breaker per model: po HF_BREAKER_FAILURES chybách/timeoutech za sebou se
+# dotazy na model HF_BREAKER_RESET sekund odmítají hned; pak projde jeden zkušební
+# (half-open) - úspěch breaker zavře, chyba ho znovu otevře.
+BREAKER_FAILURES = int(os.environ.get('HF_BREAKER_FAILURES', 5))
+BREAKER_RESET = float(os.environ.get('HF_BREAKER_RESET', 30))
+# Lokální OpenAI-kompatibilní backend pro dobu, kdy je breaker otevřený
+# (např. Ollama jako v crewai_api.py: HF_FALLBACK_URL=http://localhost:11434/v1)
+FALLBACK_URL = os.environ.get('HF_FALLBACK_URL')
+FALLBACK_MODEL = os.environ.get('HF_FALLBACK_MODEL', 'qwen2.5-coder')
+
+# Přijímání dotazů: tělo se čte po blocích a přeposílá jako surové bajty (bez
+# json parse + serializace); příliš velké dotazy končí 413 hned, velké (odhad
+# tokenů >= HF_LARGE_REQUEST_TOKENS) mají vlastní, užší pruh souběžnosti.
+MAX_BODY_BYTES = int(os.environ.get('HF_MAX_BODY_BYTES', 4 * 1024 * 1024))
+MAX_PROMPT_TOKENS = int(os.environ.get('HF_MAX_PROMPT_TOKENS', 32000))
+LARGE_REQUEST_TOKENS = int(os.environ.get('HF_LARGE_REQUEST_TOKENS', 4000))
+SMALL_LANE = int(os.environ.get('HF_SMALL_LANE', 16))
+LARGE_LANE = int(os.environ.get('HF_LARGE_LANE', 2))
+LANE_WAIT = float(os.environ.get('HF_LANE_WAIT', 5))
+BYTES_PER_TOKEN = 4     # hrubý odhad pro admission, ne přesný tokenizer
+READ_CHUNK = 64 * 1024
+
+_upstream_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('HF_UPSTREAM_WORKERS', 32)),
+                                    thread_name_prefix='hf-upstream')
+
+
+class HedgeStats:
+    """Doby do prvního bajtu (per model) a počty hedgovaných dotazů"""
+
+    def __init__(self, window=200):
+        self.lock = threading.Lock()
+        self.first_byte = {}
+        self.window = window
+        self.requests = 0
+        self.hedged = 0
+        self.wins = {}
+
+    def observe(self, model, seconds):
+        with self.lock:
+            self.first_byte.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def threshold(self, model):
+        """Za jak dlouho poslat záložní dotaz"""
+        if not HEDGE_ADAPTIVE:
+            return HEDGE_AFTER
+        with self.lock:
+            samples = sorted(self.first_byte.get(model, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_AFTER
+        p90 = samples[int(len(samples) * 0.9) - 1]
+        return min(max(p90, HEDGE_MIN_AFTER), HEDGE_AFTER)
+
+    def count(self, hedged, winner):
+        with self.lock:
+            self.requests += 1
+            self.hedged += hedged
+            if hedged:
+                self.wins[winner] = self.wins.get(winner, 0) + 1
+            return self.rate()
+
+    def rate(self):
+        return self.hedged / self.requests if self.requests else 0.0
+
+    def snapshot(self):
+        with self.lock:
+            return {'requests': self.requests, 'hedged': self.hedged, 'hedge_rate': round(self.rate(), 4),
+                    'hedge_wins': dict(self.wins)}
+
+
+hedge_stats = HedgeStats()
+
+
+class UnknownPrompt(Exception):
+    def __init__(self, prompt_ids):
+        super().__init__(f"Unknown prompt: {', '.join(prompt_ids)}")
+        self.prompt_ids = prompt_ids
+
+
+class PromptStore:
+    """Obsahově adresované prompty (id = sha256 obsahu) s LRU vyhazováním"""
+
+    def __init__(self, max_bytes, max_entries):
+        self.lock = threading.Lock()
+        self.prompts = OrderedDict()
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bytes = 0
+        self.evicted = 0
+
+    @staticmethod
+    def prompt_id(content):
+        return 'sha256:' + hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def put(self, content):
+        size = len(content.encode('utf-8'))
+        if size > self.max_bytes:
+            raise ValueError(f'Prompt has {size} bytes, the store holds at most {self.max_bytes}')
+        prompt_id = self.prompt_id(content)
+        with self.lock:
+            if prompt_id in self.prompts:
+                self.prompts.move_to_end(prompt_id)
+                return prompt_id
+            self.prompts[prompt_id] = content
+            self.bytes += size
+            while self.bytes > self.max_bytes or len(self.prompts) > self.max_entries:
+                _, old = self.prompts.popitem(last=False)
+                self.bytes -= len(old.encode('utf-8'))
+                self.evicted += 1
+        return prompt_id
+
+    def get(self, prompt_id):
+        with self.lock:
+            content = self.prompts.get(prompt_id)
+            if content is not None:
+                self.prompts.move_to_end(prompt_id)
+            return content
+
+    def snapshot(self):
+        with self.lock:
+            return {'prompts': len(self.prompts), 'bytes': self.bytes, 'evicted': self.evicted}
+
+
+prompt_store = PromptStore(PROMPT_STORE_MAX_BYTES, PROMPT_STORE_MAX_ENTRIES)
+
+
+def expand_prompts(body):
+    """Nahradí prompt_id ve zprávách obsahem z registru; neznámá id -> UnknownPrompt (všechna najednou)"""
+    messages = body.get('messages') if isinstance(body, dict) else None
+    if not isinstance(messages, list) or not any(isinstance(m, dict) and 'prompt_id' in m for m in messages):
+        return body
+    expanded = []
+    missing = []
+    for message in messages:
+        if not isinstance(message, dict) or 'prompt_id' not in message:
+            expanded.append(message)
+            continue
+        content = prompt_store.get(message['prompt_id'])
+        if content is None:
+            missing.append(str(message['prompt_id']))
+            continue
+        message = {k: v for k, v in message.items() if k != 'prompt_id'}
+        message['content'] = content
+        expanded.append(message)
+    if missing:
+        raise UnknownPrompt(missing)
+    return dict(body, messages=expanded)
+
+
+class BreakerOpen(requests.exceptions.RequestException):
+    def __init__(self, model_path, retry_after):
+        super().__init__(f"Circuit open for {model_path}, retry in {retry_after:.0f} s")
+        self.model_path = model_path
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """closed -> (N chyb za sebou) -> open -> (po reset s) -> half_open -> closed / open"""
+
+    def __init__(self, failures, reset):
+        self.lock = threading.Lock()
+        self.max_failures = failures
+        self.reset = reset
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+
+    def before_request(self, model_path):
+        """Vyhodí BreakerOpen, pokud dotaz nesmí projít (v half-open projde jen jeden)"""
+        with self.lock:
+            if self.state == 'open':
+                remaining = self.opened_at + self.reset - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise BreakerOpen(model_path, remaining)
+                self.state = 'half_open'
+            if self.state == 'half_open':
+                if self.probing:
+                    self.rejected += 1
+                    raise BreakerOpen(model_path, 0)
+                self.probing = True
+
+    def record(self, ok):
+        with self.lock:
+            self.probing = False
+            if ok:
+                self.state = 'closed'
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.max_failures:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self.lock:
+            info = {'state': self.state, 'failures': self.failures, 'rejected': self.rejected}
+            if self.state == 'open':
+                info['retry_in'] = round(max(0.0, self.opened_at + self.reset - time.monotonic()), 1)
+            return info
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(model_path):
+    with _breakers_lock:
+        breaker = _breakers.get(model_path)
+        if breaker is None:
+            breaker = _breakers[model_path] = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET)
+        return breaker
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+class Lane:
+    """Pruh souběžnosti: nejvýš `size` rozpracovaných dotazů, další čekají nejvýš LANE_WAIT s"""
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def acquire(self, timeout):
+        if not self.slots.acquire(timeout=timeout):
+            with self.lock:
+                self.rejected += 1
+            return False
+        with self.lock:
+            self.active += 1
+            self.admitted += 1
+        return True
+
+    def release(self):
+        with self.lock:
+            self.active -= 1
+        self.slots.release()
+
+    def snapshot(self):
+        with self.lock:
+            return {'size': self.size, 'active': self.active, 'admitted': self.admitted, 'rejected': self.rejected}
+
+
+lanes = {'small': Lane('small', SMALL_LANE), 'large': Lane('large', LARGE_LANE)}
+
+
+def read_body(stream, limit):
+    """Načte tělo po blocích; přes `limit` bajtů přestane číst a vyhodí PayloadTooLarge"""
+    chunks = []
+    size = 0
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            return b''.join(chunks)
+        size += len(chunk)
+        if size > limit:
+            raise PayloadTooLarge(f'Request body exceeds {limit} bytes')
+        chunks.append(chunk)
+
+
+def read_request_body():
+    """Tělo aktuálního požadavku do MAX_BODY_BYTES; podle Content-Length se odmítne ještě před čtením"""
+    if request.content_length is not None and request.content_length > MAX_BODY_BYTES:
+        raise PayloadTooLarge(f'Request body exceeds {MAX_BODY_BYTES} bytes')
+    return read_body(request.stream, MAX_BODY_BYTES)
+
+
+def estimate_tokens(raw):
+    return len(raw) // BYTES_PER_TOKEN
+
+
+def _with_model(raw, model_path, only_if_present=True):
+    """Tělo s jiným "model" - jediné místo (záložní model, fallback), kde se JSON parsuje"""
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return raw
+    if not isinstance(data, dict) or (only_if_present and 'model' not in data):
+        return raw
+    return json.dumps(dict(data, model=model_path), ensure_ascii=False).encode('utf-8')
+
+
+def _post_upstream(model_path, body, headers):
+    """Pošle dotaz na HF; vrací odpověď, jakmile dorazí hlavičky (tělo se čte až u vítěze)"""
+    breaker = breaker_for(model_path)
+    breaker.before_request(model_path)
+    started = time.monotonic()
+    ok = False
+    try:
+        response = requests.post(f"{HF_API_BASE}/{model_path}/v1/chat/completions",
+                                 data=body, headers=headers, timeout=REQUEST_TIMEOUT, stream=True)
+        ok = response.status_code < 500
+    finally:
+        # Každý výsledek (i výjimka mimo RequestException) uvolní half-open sondu
+        breaker.record(ok)
+    hedge_stats.observe(model_path, time.monotonic() - started)
+    return response
+
+
+def _post_fallback(body):
+    """Dotaz na lokální OpenAI-kompatibilní backend (Ollama)"""
+    return requests.post(f"{FALLBACK_URL.rstrip('/')}/chat/completions",
+                         data=_with_model(body, FALLBACK_MODEL, only_if_present=False),
+                         headers={'Authorization': 'Bearer NA', 'Content-Type': 'application/json'},
+                         timeout=REQUEST_TIMEOUT, stream=True)
+
+
+def _close_loser(future):
+    """Poražený dotaz: HTTP/1.1 neumí zrušit rozběhnutý požadavek, spojení se zavře hned, jak odpoví"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _failed_fast(future):
+    """Hotový dotaz, který stojí za hedging: 5xx, chyba spojení nebo otevřený breaker"""
+    error = future.exception()
+    if error is not None:
+        return isinstance(error, requests.exceptions.RequestException)
+    return future.result().status_code >= 500
+
+
+def hedged_post(model_path, body, headers, hedge_model):
+    """Vrací (odpověď, vítězný model, hedgováno)"""
+    primary = _upstream_pool.submit(_post_upstream, model_path, body, headers)
+    done, _ = wait([primary], timeout=hedge_stats.threshold(model_path))
+    # Rychlá chyba primárního modelu se hedguje stejně jako pomalá odpověď
+    # (u otevřeného breakeru tak dostane přednost záložní model před lokálním fallbackem)
+    if done and not _failed_fast(primary):
+        return primary.result(), model_path, False
+
+    secondary = _upstream_pool.submit(_post_upstream, hedge_model, _with_model(body, hedge_model), headers)
+    pending = {primary: model_path, secondary: hedge_model}
+    winner = fallback = error = None
+    while pending and winner is None:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            model = pending.pop(future)
+            try:
+                response = future.result()
+            except requests.exceptions.RequestException as e:
+                error = error or e
+                continue
+            # Rychlá chyba (např. 503 při načítání modelu) nevyhrává, dokud druhý dotaz běží
+            if winner is None and response.status_code < 500:
+                winner = (response, model)
+            elif fallback is None:
+                fallback = (response, model)
+            else:
+                response.close()
+    for future in pending:
+        future.add_done_callback(_close_loser)
+    if winner is None:
+        winner = fallback
+    elif fallback is not None:
+        fallback[0].close()
+    if winner is None:
+        raise error
+    return winner[0], winner[1], True
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({"status": "ok", "service": "HuggingFace Proxy"}), 200
+    return jsonify({"status": "ok", "service": "HuggingFace Proxy",
+                    "hedging": dict(hedge_stats.snapshot(), enabled=bool(HEDGE_MODEL),
+                                    secondary_model=HEDGE_MODEL),
+                    "prompt_store": prompt_store.snapshot(),
+                    "breakers": {model: b.snapshot() for model, b in sorted(_breakers.items())},
+                    "fallback": {"url": FALLBACK_URL, "model": FALLBACK_MODEL} if FALLBACK_URL else None,
+                    "admission": {"max_body_bytes": MAX_BODY_BYTES, "max_prompt_tokens": MAX_PROMPT_TOKENS,
+                                  "large_request_tokens": LARGE_REQUEST_TOKENS,
+                                  "lanes": {name: lane.snapshot() for name, lane in lanes.items()}}}), 200
+
+
+@app.route('/prompts', methods=['POST'])
+def register_prompts():
+    """Zaregistruje prompt ({"content": "..."}) nebo více promptů ({"prompts": ["...", ...]})"""
+    try:
+        data = json.loads(read_request_body())
+    except PayloadTooLarge as e:
+        return jsonify({"error": str(e), "code": "body_too_large"}), 413
+    except ValueError:
+        return jsonify({"error": "Invalid JSON body"}), 400
+    if not isinstance(data, dict):
+        return jsonify({"error": 'Expected {"content": "..."} or {"prompts": ["...", ...]}'}), 400
+    single = 'content' in data
+    contents = [data['content']] if single else data.get('prompts')
+    if not isinstance(contents, list) or not contents or not all(isinstance(c, str) for c in contents):
+        return jsonify({"error": 'Expected {"content": "..."} or {"prompts": ["...", ...]}'}), 400
+    try:
+        ids = [prompt_store.put(c) for c in contents]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 413
+    return jsonify({"id": ids[0]} if single else {"ids": ids}), 201
+
+
+@app.route('/prompts/<prompt_id>', methods=['GET'])
+def prompt_status(prompt_id):
+    """Je prompt zaregistrovaný? (klient se může zeptat, než ho pošle znovu)"""
+    content = prompt_store.get(prompt_id)
+    if content is None:
+        return jsonify({"error": "Unknown prompt", "code": "unknown_prompt", "prompt_ids": [prompt_id]}), 404
+    return jsonify({"id": prompt_id, "bytes": len(content.encode('utf-8'))}), 200
 
 @app.route('/models/<path:model_path>/v1/chat/completions', methods=['POST'])
 def proxy_chat(model_path):
@@ -29,24 +462,39 @@ def proxy_chat(model_path):
         if not auth_header:
             return jsonify({"error": "Missing Authorization header"}), 401
 
-        # Připrav URL
-        url = f"https://api-inference.huggingface.co/models/{model_path}/v1/chat/completions"
-
         # Přeposlat request
         headers = {
             'Authorization': auth_header,
             'Content-Type': 'application/json'
         }
 
-        response = requests.post(
-            url,
-            json=request.json,
-            headers=headers,
-            timeout=90
-        )
+        try:
+            body = read_request_body()
+        except PayloadTooLarge as e:
+            return jsonify({"error": str(e), "code": "body_too_large"}), 413
 
-        # Vrátit odpověď
-        return jsonify(response.json()), response.status_code
+        # JSON se parsuje jen kvůli odkazům na registr promptů
+        if b'"prompt_id"' in body:
+            try:
+                body = json.dumps(expand_prompts(json.loads(body)), ensure_ascii=False).encode('utf-8')
+            except ValueError:
+                return jsonify({"error": "Invalid JSON body"}), 400
+            except UnknownPrompt as e:
+                # Klient prompty znovu zaregistruje (POST /prompts) a dotaz zopakuje
+                return jsonify({"error": str(e), "code": "unknown_prompt", "prompt_ids": e.prompt_ids}), 422
+
+        tokens = estimate_tokens(body)
+        if tokens > MAX_PROMPT_TOKENS:
+            return jsonify({"error": f"Prompt too large: ~{tokens} tokens, limit {MAX_PROMPT_TOKENS}",
+                            "code": "prompt_too_large", "estimated_tokens": tokens}), 413
+        lane = lanes['large' if tokens >= LARGE_REQUEST_TOKENS else 'small']
+        if not lane.acquire(LANE_WAIT):
+            return jsonify({"error": f"Proxy busy ({lane.name} requests)", "code": "lane_busy"}), \
+                503, {'Retry-After': '1'}
+        try:
+            return _forward(model_path, body, headers)
+        finally:
+            lane.release()
 
     except requests.exceptions.Timeout:
         return jsonify({"error": "Request timeout"}), 504
@@ -55,6 +503,34 @@ def proxy_chat(model_path):
     except Exception as e:
         return jsonify({"error": f"Internal error: {str(e)}"}), 500
 
+
+def _forward(model_path, body, headers):
+    """Přepošle tělo (hedging, breaker, fallback) a vrátí odpověď upstreamu beze změny"""
+    hedge_model = request.headers.get('X-Hedge-Model') or HEDGE_MODEL
+    hedge_rate = None
+    try:
+        if hedge_model and hedge_model != model_path:
+            response, winner, hedged = hedged_post(model_path, body, headers, hedge_model)
+            hedge_rate = hedge_stats.count(hedged, winner)
+        else:
+            response, winner, hedged = _post_upstream(model_path, body, headers), model_path, False
+    except BreakerOpen as e:
+        if not FALLBACK_URL:
+            retry_after = max(1, int(e.retry_after + 0.999))
+            return jsonify({"error": str(e), "code": "circuit_open", "retry_after": retry_after}), \
+                503, {'Retry-After': str(retry_after)}
+        response, winner, hedged = _post_fallback(body), f'fallback/{FALLBACK_MODEL}', False
+
+    # Vrátit odpověď (tělo upstreamu se přeposílá bez parsování)
+    with response:
+        result = Response(response.content, status=response.status_code,
+                          content_type=response.headers.get('Content-Type', 'application/json'))
+    result.headers['X-Proxy-Model'] = winner
+    if hedge_rate is not None:
+        result.headers['X-Proxy-Hedged'] = '1' if hedged else '0'
+        result.headers['X-Proxy-Hedge-Rate'] = f'{hedge_rate:.4f}'
+    return result
+
 @app.route('/models', methods=['GET'])
 def list_models():
     """Seznam dostupných modelů"""
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Moduly v python/ se importují přímo (crewai_api.py je spouští stejně)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
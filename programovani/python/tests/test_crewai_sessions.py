@@ -0,0 +1,30 @@
+from crewai_sessions import SessionStore
+
+
+def _run(store, turns, size=60):
+    session, _ = store.get_or_create(None, 'coder')
+    for i in range(turns):
+        store.record_turn(session, f'úkol {i} ' + 'x' * size, f'výsledek {i} ' + 'y' * size)
+    return session
+
+
+def test_compaction_keeps_recent_turns_verbatim():
+    store = SessionStore(token_budget=200, max_turns=4)
+    session = _run(store, 12, size=200)
+    assert session.compactions > 0
+    assert len(session.turns) >= 1
+    assert session.turns[-1][0].startswith('úkol 11 ')
+
+
+def test_compaction_with_default_limits_keeps_more_than_one_turn():
+    store = SessionStore()
+    session = _run(store, 40, size=400)
+    assert session.compactions > 0
+    assert len(session.turns) >= 2
+
+
+def test_oversized_turn_is_never_evicted():
+    store = SessionStore(token_budget=50, max_turns=4)
+    session = _run(store, 3, size=1000)
+    assert len(session.turns) == 1
+    assert session.turns[0][0].startswith('úkol 2 ')
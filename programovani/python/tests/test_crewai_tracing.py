@@ -0,0 +1,34 @@
+import uuid
+
+import pytest
+
+pytest.importorskip('crewai')
+
+import crewai_tracing
+from crewai_tracing import RunTracer, new_run_id
+
+try:
+    from crewai.events import crewai_event_bus, LLMCallStartedEvent, LLMCallCompletedEvent
+    from crewai.events.types.llm_events import LLMCallType
+except ImportError:
+    pytest.skip('CrewAI without the events API', allow_module_level=True)
+
+
+def test_event_bus_handlers_see_the_active_tracer():
+    assert crewai_tracing.EVENT_BUS_AVAILABLE
+    call_id = uuid.uuid4().hex
+    with RunTracer(new_run_id()) as tracer:
+        crewai_event_bus.emit(None, LLMCallStartedEvent(call_id=call_id, model='qwen2.5-coder',
+                                                        agent_role='Frontend Vývojář'))
+        crewai_event_bus.emit(None, LLMCallCompletedEvent(call_id=call_id, model='qwen2.5-coder',
+                                                          agent_role='Frontend Vývojář', response='ok',
+                                                          call_type=LLMCallType.LLM_CALL))
+    spans = [e for e in tracer.to_chrome()['traceEvents'] if e.get('cat') == 'llm']
+    assert [e['name'] for e in spans] == ['llm: Frontend Vývojář']
+    assert spans[0]['args']['model'] == 'qwen2.5-coder'
+
+
+def test_no_tracer_outside_a_run():
+    with RunTracer(new_run_id()):
+        pass
+    assert crewai_tracing.current_tracer() is None
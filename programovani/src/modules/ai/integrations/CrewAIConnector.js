@@ -260,8 +260,9 @@ python crewai_api.py</pre>
 
   /**
    * Run single agent task
+   * @param {Object} [options] - { sessionId, newSession, context } pro serverovou relaci
    */
-  async runSingleAgent(agentId, task) {
+  async runSingleAgent(agentId, task, options = {}) {
     if (!this.isAvailable) {
       throw new Error('CrewAI API not available');
     }
@@ -274,7 +275,10 @@ python crewai_api.py</pre>
         },
         body: JSON.stringify({
           agent_id: agentId,
-          task: task
+          task: task,
+          session_id: options.sessionId,
+          new_session: options.newSession,
+          context: options.context
         })
       });
 
@@ -287,7 +291,9 @@ python crewai_api.py</pre>
       return {
         success: true,
         result: data.result,
-        agent: data.agent
+        agent: data.agent,
+        sessionId: data.session_id,
+        sessionCreated: data.session_created
       };
     } catch (error) {
       console.error('Error running single agent:', error);
@@ -1,9 +1,28 @@
+"""
+Doplní standardní line-clamp ke každému -webkit-line-clamp: 2 v html_studio.html.
+Funkci add_line_clamp používá i watch_tools.py (transformace line_clamp).
+"""
+import re
 from pathlib import Path
-p=Path('html_studio.html')
-s=p.read_text(encoding='utf-8')
-new = s.replace('-webkit-line-clamp: 2;','-webkit-line-clamp: 2;\n        line-clamp: 2;')
-if new!=s:
-    p.write_text(new,encoding='utf-8')
-    print('Inserted line-clamp properties')
-else:
-    print('No changes')
+
+_LINE_CLAMP_RE = re.compile(r'-webkit-line-clamp: 2;(?!\s*line-clamp)')
+
+
+def add_line_clamp(text):
+    """Text s doplněným line-clamp: 2; už doplněná místa se nemění"""
+    return _LINE_CLAMP_RE.sub('-webkit-line-clamp: 2;\n        line-clamp: 2;', text)
+
+
+def main():
+    p = Path('html_studio.html')
+    s = p.read_text(encoding='utf-8')
+    new = add_line_clamp(s)
+    if new != s:
+        p.write_text(new, encoding='utf-8')
+        print('Inserted line-clamp properties')
+    else:
+        print('No changes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sdílené úpravy AIPanel.js pro refaktoringové skripty (safe_refactor,
+refactor_aipanel, complete_refactor, remove_prompt_block).
+
+Každá funkce jen přidává úpravy do EditTransaction - kotvy se hledají podle
+obsahu, ne podle čísel řádků, a už provedená úprava se podruhé nepřidá.
+"""
+import re
+from pathlib import Path
+
+AIPANEL_PATH = Path(__file__).resolve().parents[1] / 'src' / 'modules' / 'ai' / 'AIPanel.js'
+
+HISTORY_IMPORT = "import { ChatHistoryService } from './services/ChatHistoryService.js';"
+SERVICE_IMPORTS = (
+    "import { ChatService } from './services/ChatService.js';\n"
+    "import { PromptBuilder } from './services/PromptBuilder.js';\n"
+    "import { MESSAGES, ICONS } from './constants/Messages.js';\n"
+)
+HISTORY_INIT = "this.chatHistory = state.get('ai.chatHistory') || [];"
+PROMPT_START = "activeFileId = state.get('files.active');"
+PROMPT_END = "// Get provider and model from UI"
+PROMPT_BLOCK = (
+    "\n"
+    "      // Build system prompt using PromptBuilder\n"
+    "      let systemPrompt = this.promptBuilder.buildSystemPrompt(\n"
+    "        message,\n"
+    "        currentCode,\n"
+    "        openFiles,\n"
+    "        activeFileId\n"
+    "      );\n"
+    "\n"
+)
+
+# this.chatHistory.push({ role: 'user', content: message }); (+ komentáře a state.set za ním)
+# content je jediný výraz bez čárky na nejvyšší úrovni - push s dalšími klíči
+# (timestamp: ...) se nepřepisuje, jen nahlásí (viz PUSH_ANY)
+_CONTENT = (r"(?:[^,'\"`(){}\n]|'(?:[^'\\\n]|\\.)*'|\"(?:[^\"\\\n]|\\.)*\"|`[^`\\\n$]*`"
+            r"|\([^()\n]*\))+?")
+PUSH_RE = re.compile(
+    r"^([ \t]*)this\.chatHistory\.push\(\{\s*role:\s*'(\w+)',\s*content:\s*(" + _CONTENT + r"),?\s*\}\);[ \t]*\n"
+    r"(?:(?:[ \t]*//[^\n]*\n)*[ \t]*state\.set\('ai\.chatHistory', this\.chatHistory\);[ \t]*\n)?",
+    re.MULTILINE,
+)
+PUSH_ANY = 'this.chatHistory.push('
+STATE_SET_RE = re.compile(r"^[ \t]*state\.set\('ai\.chatHistory', this\.chatHistory\);[ \t]*\n", re.MULTILINE)
+CODE_STATUS_MARKERS = (
+    'delete lastMsg.codeStatus',
+    "lastMsg.codeStatus[`code-${codeIndex}`] = 'accepted';",
+    "lastMsg.codeStatus[`code-${codeIndex}`] = 'rejected';",
+)
+
+ANCHORS = {
+    'history_import': HISTORY_IMPORT,
+    'history_init': HISTORY_INIT,
+    'push': PUSH_RE,
+    'push_other': PUSH_ANY,     # co PUSH_RE nepokryl (kotvy se nepřekrývají)
+    'state_set': STATE_SET_RE,
+    'prompt_start': PROMPT_START,
+    'prompt_end': PROMPT_END,
+}
+
+
+def locate(tx):
+    """Jediný průchod souborem pro všechny kotvy níže"""
+    return tx.locate(ANCHORS)
+
+
+def add_service_imports(tx, found):
+    if 'ChatService.js' in tx.text or not found['history_import']:
+        return 0
+    pos = tx.line_end(found['history_import'][0][0])
+    tx.insert(pos, SERVICE_IMPORTS, label='imports')
+    return 1
+
+
+def init_chat_service(tx, found):
+    if not found['history_init']:
+        return 0
+    start = found['history_init'][0][0]
+    indent = tx.text[tx.line_start(start):start]
+    tx.replace_lines(start, 1, f"{indent}this.chatService = new ChatService();\n"
+                               f"{indent}this.promptBuilder = new PromptBuilder(this);\n"
+                               f"{indent}this.chatHistory = this.chatService.getHistory();\n", label='constructor')
+    return 1
+
+
+def replace_history_pushes(tx, found, limit=None):
+    """this.chatHistory.push({...}) (+ state.set) -> chatService.addToHistory + getHistory
+
+    Prvních `limit` push v pořadí souboru; ty, které nejde bezpečně přepsat
+    (další klíče vedle content), se přeskočí a vypíšou. Vrací počet přepsaných.
+    """
+    pushes = sorted([(span, True) for span in found['push']] +
+                    [(span, False) for span in found['push_other']])[:limit]
+    count = 0
+    for (start, end), rewritable in pushes:
+        if not rewritable:
+            line_end = tx.text.find('\n', start)
+            print(f"⚠️  push na řádku {tx.line_number(start)} přeskočen (content není jediný výraz): "
+                  f"{tx.text[start:line_end if line_end != -1 else len(tx.text)].strip()}")
+            continue
+        m = PUSH_RE.match(tx.text, start)
+        indent, role, content = m.group(1), m.group(2), m.group(3)
+        tx.replace(start, end, f"{indent}this.chatService.addToHistory('{role}', {content});\n"
+                               f"{indent}this.chatHistory = this.chatService.getHistory();\n",
+                   label=f'push {role} (line {tx.line_number(start)})')
+        count += 1
+    return count
+
+
+def drop_redundant_state_sets(tx, found):
+    """state.set('ai.chatHistory', ...) hned za změnou codeStatus je zbytečný"""
+    count = 0
+    for start, end in found['state_set']:
+        prev_start = tx.line_start(max(start - 1, 0))
+        prev_line = tx.text[prev_start:start]
+        if start > 0 and any(marker in prev_line for marker in CODE_STATUS_MARKERS):
+            tx.delete(start, end, label=f'state.set (line {tx.line_number(start)})')
+            count += 1
+    return count
+
+
+def prompt_block_range(tx, found):
+    """Rozsah řádků mezi `activeFileId = ...` a `// Get provider and model from UI`"""
+    if not found['prompt_start']:
+        return None
+    start = tx.line_end(found['prompt_start'][0][0])
+    end = next((tx.line_start(s) for s, _ in found['prompt_end'] if s > start), None)
+    if end is None or end <= start:
+        return None
+    return start, end
+
+
+def replace_prompt_block(tx, found):
+    span = prompt_block_range(tx, found)
+    # Už přepsaný blok (i pozdější úpravy volání PromptBuilderu) se nepřepisuje
+    if span is None or 'this.promptBuilder.buildSystemPrompt(' in tx.text[span[0]:span[1]]:
+        return None
+    tx.replace(*span, PROMPT_BLOCK, label='prompt block')
+    return tx.text.count('\n', *span) - PROMPT_BLOCK.count('\n')
+
+
+def _builder_call(tx, start, end):
+    """Rozsah řádků s voláním this.promptBuilder.buildSystemPrompt(...) v [start, end), nebo None"""
+    call = tx.text.find('this.promptBuilder.buildSystemPrompt(', start, end)
+    if call == -1:
+        return None
+    close = tx.text.find(');', call, end)
+    if close == -1:
+        return None
+    return tx.line_start(call), tx.line_end(close)
+
+
+def _has_code(text):
+    return any(line.strip() and not line.strip().startswith('//') for line in text.splitlines())
+
+
+def remove_prompt_block(tx, found):
+    """Smaže duplicitní prompt blok; živé volání PromptBuilderu zůstane (už smazáno -> 0)"""
+    span = prompt_block_range(tx, found)
+    if span is None:
+        return None
+    keep = _builder_call(tx, *span)
+    parts = [span] if keep is None else [(span[0], keep[0]), (keep[1], span[1])]
+    # Prázdné řádky a komentáře kolem volání nejsou duplicitní blok
+    parts = [(a, b) for a, b in parts if _has_code(tx.text[a:b])]
+    for a, b in parts:
+        tx.delete(a, b, label='prompt block')
+    return sum(tx.text.count('\n', a, b) for a, b in parts)
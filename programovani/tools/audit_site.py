@@ -0,0 +1,290 @@
+"""
+Audit statických HTML stránek -> a11y-report.json.
+
+Pro každý .html/.htm soubor (relativní cesta -> záznam) zapíše:
+
+- images:        <img> bez atributu alt            [{"line", "src"}]
+- inputs:        <input>/<select>/<textarea> bez popisku (label for=, obalující
+                 <label>, aria-label, aria-labelledby, title)  [{"line", "tag", "type", "id"}]
+- empty_buttons: <button> bez textu a bez aria-label/title, <input type=button> bez value
+                 [{"line", "id"}]
+- doctype_count: počet <!DOCTYPE> (víc než 1 = slepený dokument, viz move_preamble)
+- size:          bytes, inline_styles (počet style=), inline_base64_bytes (payloady
+                 data:...;base64,), inline_script_bytes, external_script_bytes
+                 (velikost lokálních <script src>), external_scripts
+
+Soubor se čte po 64 KiB blocích a jde rovnou do streamovacího parseru
+(html.parser), base64 se počítá nad stejnými bloky - celý soubor v paměti
+není potřeba. Soubory se zpracují paralelně v process poolu; výsledky se
+cachují podle obsahového hashe (FileManifest) a report se zapisuje průběžně
+v pořadí souborů, takže je stejný při libovolném -j.
+
+    python tools/audit_site.py [cesty...] [-o a11y-report.json] [-j N] [--force]
+"""
+import argparse
+import codecs
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+
+from incremental import FileManifest, default_jobs
+
+ROOT = Path(__file__).resolve().parents[1]
+REPORT_PATH = ROOT / 'a11y-report.json'
+SUFFIXES = ('.html', '.htm')
+SKIP_DIRS = {'node_modules', 'dist', 'build', '.git', '.cache', 'archive'}
+CHUNK = 1 << 16
+
+NO_LABEL_TYPES = {'hidden', 'submit', 'reset', 'button', 'image'}
+LABEL_ATTRS = ('aria-label', 'aria-labelledby', 'title')
+_BASE64_RE = re.compile(rb'data:[\w.+-]*/?[\w.+-]*(?:;[\w.+-]+(?:=[^;,"\'()\s]+)?)*;base64,([A-Za-z0-9+/=]*)')
+ITEM_ORDER = ('line', 'tag', 'type', 'id', 'src')
+SIZE_ORDER = ('bytes', 'inline_styles', 'inline_base64_bytes', 'inline_script_bytes',
+              'external_script_bytes', 'external_scripts')
+_CARRY = 256        # hlavička data: URI rozdělená mezi bloky
+
+
+class Base64Counter:
+    """Sečte velikost base64 payloadů v proudu bloků"""
+
+    def __init__(self):
+        self.total = 0
+        self.carry = b''
+
+    def feed(self, chunk, final=False):
+        buf = self.carry + chunk
+        keep = max(0, len(buf) - _CARRY)
+        for m in _BASE64_RE.finditer(buf):
+            if m.end() == len(buf) and not final:
+                keep = m.start()        # payload může pokračovat v dalším bloku
+                break
+            self.total += m.end(1) - m.start(1)
+            keep = max(keep, m.end())
+        self.carry = b'' if final else buf[keep:]
+
+    def close(self):
+        self.feed(b'', final=True)
+        return self.total
+
+
+class AuditParser(HTMLParser):
+    def __init__(self, path):
+        super().__init__(convert_charrefs=True)
+        self.path = path
+        self.images = []
+        self.inputs = []
+        self.empty_buttons = []
+        self.doctype_count = 0
+        self.inline_styles = 0
+        self.inline_script_bytes = 0
+        self.external_scripts = []
+        self.label_for = set()
+        self.label_depth = 0
+        self.buttons = []           # otevřené <button>: [záznam, má obsah]
+        self.in_script = False
+
+    def handle_decl(self, decl):
+        if decl.lower().startswith('doctype'):
+            self.doctype_count += 1
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        line = self.getpos()[0]
+        if 'style' in a:
+            self.inline_styles += 1
+        if tag == 'img':
+            if 'alt' not in a:
+                self.images.append({'line': line, 'src': a.get('src') or ''})
+            elif a['alt'] and self.buttons:
+                self.buttons[-1][1] = True
+        elif tag == 'label':
+            self.label_depth += 1
+            if a.get('for'):
+                self.label_for.add(a['for'])
+        elif tag in ('input', 'select', 'textarea'):
+            kind = (a.get('type') or 'text').lower() if tag == 'input' else tag
+            if tag == 'input' and kind in ('button', 'submit', 'reset'):
+                if kind == 'button' and not a.get('value') and not any(a.get(x) for x in LABEL_ATTRS):
+                    self.empty_buttons.append({'line': line, 'id': a.get('id') or ''})
+            elif kind not in NO_LABEL_TYPES and not self.label_depth and not any(a.get(x) for x in LABEL_ATTRS):
+                self.inputs.append({'line': line, 'tag': tag, 'type': kind, 'id': a.get('id') or ''})
+        elif tag == 'button':
+            labelled = any(a.get(x) for x in LABEL_ATTRS)
+            self.buttons.append([{'line': line, 'id': a.get('id') or ''}, labelled])
+        elif tag == 'script':
+            if a.get('src'):
+                self.external_scripts.append(a['src'])
+            self.in_script = True
+        elif self.buttons and tag == 'svg' and any(a.get(x) for x in LABEL_ATTRS):
+            self.buttons[-1][1] = True
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in ('label', 'button', 'script'):
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag == 'label' and self.label_depth:
+            self.label_depth -= 1
+        elif tag == 'button' and self.buttons:
+            entry, has_content = self.buttons.pop()
+            if not has_content:
+                self.empty_buttons.append(entry)
+        elif tag == 'script':
+            self.in_script = False
+
+    def handle_data(self, data):
+        if self.in_script:
+            self.inline_script_bytes += len(data.encode('utf-8'))
+        elif self.buttons and data.strip():
+            self.buttons[-1][1] = True
+
+    def finish(self):
+        self.close()
+        for entry, has_content in self.buttons:     # neuzavřené <button>
+            if not has_content:
+                self.empty_buttons.append(entry)
+        self.inputs = [i for i in self.inputs if not i['id'] or i['id'] not in self.label_for]
+        self.empty_buttons.sort(key=lambda e: e['line'])
+
+
+def audit_file(path):
+    """Projde soubor po blocích; vrací (sha1, záznam reportu bez external_script_bytes)"""
+    sha1 = hashlib.sha1()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    parser = AuditParser(path)
+    b64 = Base64Counter()
+    size = 0
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK):
+            size += len(chunk)
+            sha1.update(chunk)
+            b64.feed(chunk)
+            parser.feed(decoder.decode(chunk))
+    parser.feed(decoder.decode(b'', final=True))
+    parser.finish()
+    return sha1.hexdigest(), {
+        'images': parser.images,
+        'inputs': parser.inputs,
+        'empty_buttons': parser.empty_buttons,
+        'doctype_count': parser.doctype_count,
+        'size': {
+            'bytes': size,
+            'inline_styles': parser.inline_styles,
+            'inline_base64_bytes': b64.close(),
+            'inline_script_bytes': parser.inline_script_bytes,
+            'external_scripts': parser.external_scripts,
+        },
+    }
+
+
+def external_script_bytes(path, sources):
+    """Velikost lokálních skriptů; počítá se při každém běhu (mění se nezávisle na HTML)"""
+    total = 0
+    for src in sources:
+        if '://' in src or src.startswith(('//', 'data:')):
+            continue
+        src = src.split('?', 1)[0].split('#', 1)[0]
+        target = (ROOT / src.lstrip('/')) if src.startswith('/') else (path.parent / src)
+        try:
+            total += target.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+def report_entry(path, result):
+    """Záznam reportu v pevném pořadí klíčů (cache v manifestu má klíče seřazené)"""
+    size = dict(result['size'], external_script_bytes=external_script_bytes(path, result['size']['external_scripts']))
+    entry = {key: [{k: item[k] for k in ITEM_ORDER if k in item} for item in result[key]]
+             for key in ('images', 'inputs', 'empty_buttons')}
+    entry['doctype_count'] = result['doctype_count']
+    entry['size'] = {k: size[k] for k in SIZE_ORDER}
+    return entry
+
+
+def html_files(paths):
+    for base in paths:
+        base = Path(base).resolve()
+        if base.is_file():
+            yield base
+            continue
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for name in filenames:
+                if name.lower().endswith(SUFFIXES):
+                    yield Path(dirpath) / name
+
+
+def report_key(path):
+    try:
+        return path.relative_to(ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def write_report(out, entries):
+    """Zapisuje report po záznamech (stejný tvar jako json.dump(..., indent=2)); entries = (klíč, záznam)"""
+    tmp = out.with_name(out.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8', newline='\n') as f:
+        f.write('{')
+        first = True
+        for key, entry in entries:
+            f.write(('\n' if first else ',\n') + '  ' + json.dumps(key, ensure_ascii=False) + ': '
+                    + json.dumps(entry, indent=2, ensure_ascii=False).replace('\n', '\n  '))
+            f.flush()
+            first = False
+        f.write('\n}\n' if not first else '}\n')
+    os.replace(tmp, out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Audit HTML pages (a11y checks + size metrics) into a11y-report.json')
+    parser.add_argument('paths', nargs='*', default=[ROOT], help='files or directories (default: project root)')
+    parser.add_argument('-o', '--output', type=Path, default=REPORT_PATH)
+    parser.add_argument('-j', '--jobs', type=int, default=default_jobs(), help='parallel worker processes')
+    parser.add_argument('--force', action='store_true', help='ignore cached results and re-parse every file')
+    args = parser.parse_args()
+
+    files = sorted(set(html_files(args.paths)))
+    manifest = FileManifest('audit_site', [__file__], ROOT)
+    cached = {}
+    if not args.force:
+        for path in files:
+            result = manifest.cached(path, 'result')
+            if result is not None:
+                cached[path] = result
+    todo = [p for p in files if p not in cached]
+    totals = {'images': 0, 'inputs': 0, 'empty_buttons': 0, 'multi_doctype': 0}
+
+    def entries(executor):
+        futures = {p: executor.submit(audit_file, p) for p in todo} if executor else {}
+        for path in files:
+            result = cached.get(path)
+            if result is None:
+                sha1, result = futures[path].result() if executor else audit_file(path)
+                manifest.record(path, sha1, result=result)
+            entry = report_entry(path, result)
+            for key in ('images', 'inputs', 'empty_buttons'):
+                totals[key] += len(entry[key])
+            totals['multi_doctype'] += entry['doctype_count'] > 1
+            yield report_key(path), entry
+
+    if args.jobs > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(todo))) as executor:
+            write_report(args.output, entries(executor))
+    else:
+        write_report(args.output, entries(None))
+    manifest.save()
+
+    print(f"Audited {len(files)} HTML files ({len(cached)} cached, {len(todo)} parsed) -> {report_key(args.output.resolve())}")
+    print(f"  images without alt: {totals['images']}, unlabeled inputs: {totals['inputs']}, "
+          f"empty buttons: {totals['empty_buttons']}, files with several doctypes: {totals['multi_doctype']}")
+
+
+if __name__ == '__main__':
+    main()
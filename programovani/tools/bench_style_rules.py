@@ -0,0 +1,91 @@
+"""
+Microbenchmark: old sequential re.sub passes vs. compiled rule matcher
+for replace_inline_styles_regex.
+
+Generates a synthetic HTML document and rule tables of growing size, runs
+both paths on the same input and checks that they produce the same output.
+
+    python tools/bench_style_rules.py --tags 20000 --rules 35 200 500
+"""
+import argparse
+import json
+import random
+import re
+import time
+
+from html_rewriter import rewrite
+from style_rules import DEFAULT_RULES_PATH, StyleRules, load_rules
+
+
+def legacy_replace(text, rules):
+    """The pre-compiled path: one full-document re.sub per rule plus the d-none passes"""
+    for rule in rules:
+        action = 'class' if 'class' in rule else 'style'
+        value = rule.get('class', rule.get('set_style'))
+        if 'style' in rule:
+            text = re.sub(r'style="' + re.escape(rule['style']) + '"',
+                          lambda m, r=f'{action}="{value}"': r, text)
+        else:
+            text = re.sub(r'style="' + rule['pattern'] + '"', f'{action}="{value}"', text)
+    text = re.sub(r'(<[a-zA-Z0-9\-]+[^>]*?)\sclass="([^"]*)"([^>]*?)\sclass="d-none"', r'\1 class="\2 d-none"\3', text)
+    text = re.sub(r'(<[a-zA-Z0-9\-]+[^>]*?)class="([^"]*)"([^>]*?)\sstyle="display: none;"', r'\1class="\2 d-none"\3', text)
+    text = re.sub(r'<([a-zA-Z0-9\-]+)([^>]*?)\sstyle="display: none;"([^>]*?)>', r'<\1\2 class="d-none"\3>', text)
+    return text
+
+
+def synthetic_rules(base, count):
+    """Repo rule table padded with generated exact and pattern rules up to `count`"""
+    rules = [r for r in base if 'style' in r]
+    i = 0
+    while len(rules) < count:
+        if i % 10 == 9:
+            rules.append({'pattern': rf'gap:\s*({i}\d)px;?', 'class': rf'gap-\1'})
+        else:
+            rules.append({'style': f'padding: {i}px {i % 7}px;', 'class': f'pad-{i}-{i % 7}'})
+        i += 1
+    return rules
+
+
+def synthetic_html(rules, tags, seed=1):
+    rnd = random.Random(seed)
+    exact = [r['style'] for r in rules if 'style' in r]
+    parts = ['<!DOCTYPE html>\n<html><body>\n']
+    for n in range(tags):
+        roll = rnd.random()
+        if roll < 0.5:
+            style = rnd.choice(exact)
+        elif roll < 0.6:
+            style = f'gap: {rnd.randrange(10, 99)}px;'
+        else:
+            style = f'color: #{rnd.randrange(0xffffff):06x}; margin: {n % 40}px;'
+        parts.append(f'<div style="{style}">Položka {n} – žluťoučký kůň</div>\n')
+    parts.append('</body></html>\n')
+    return ''.join(parts)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tags', type=int, default=20000, help='styled tags in the synthetic document')
+    parser.add_argument('--rules', type=int, nargs='+', default=[35, 200, 500], help='rule table sizes')
+    args = parser.parse_args()
+
+    load_rules(DEFAULT_RULES_PATH)  # validate the shipped table
+    base = json.loads(DEFAULT_RULES_PATH.read_text(encoding='utf-8'))['rules']
+    print(f"{'rules':>6} {'tags':>7} {'legacy s':>10} {'compiled s':>11} {'speedup':>8}  same output")
+    for count in args.rules:
+        rules = synthetic_rules(base, count)
+        html = synthetic_html(rules, args.tags)
+        matcher = StyleRules(rules)
+        old, t_old = timed(legacy_replace, html, rules)
+        (new, _), t_new = timed(rewrite, html, matcher.apply)
+        print(f"{len(rules):>6} {args.tags:>7} {t_old:>10.3f} {t_new:>11.3f} {t_old / t_new:>7.1f}x  {old == new}")
+
+
+if __name__ == '__main__':
+    main()
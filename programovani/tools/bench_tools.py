@@ -0,0 +1,244 @@
+"""
+Benchmark suite for the HTML/CSS tools on synthetic corpora.
+
+Generates a corpus of configurable size (HTML with N style= attributes and
+UTF-8 heavy Czech text, css/styles.css, a mojibake-damaged JS file) in a
+temporary directory and runs each tool on a fresh copy of it in its own
+process, so time and peak memory are measured per tool:
+
+- convert_inline_styles  (convert_file on the big page)
+- move_inline_to_css     (process_file + registry write)
+- replace_inline_styles_regex (process_file with the shipped rule table)
+- fix_encoding           (fix_text on the damaged JS)
+
+Output equivalence: every run reports the sha1 of the files the tool wrote.
+--save-baseline stores them for the corpus parameters, later runs compare
+against it (so a speedup can be checked to produce byte-identical output).
+convert_inline_styles and move_inline_to_css share the class registry, so
+their HTML output is also cross-checked against each other.
+
+    python tools/bench_tools.py --size-mb 10 --styles 100000
+    python tools/bench_tools.py --size-mb 1 --styles 10000 --save-baseline
+"""
+import argparse
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from incremental import CACHE_DIR, content_hash
+
+TOOLS_DIR = Path(__file__).resolve().parent
+TOOLS = ('convert_inline_styles', 'move_inline_to_css', 'replace_inline_styles_regex', 'fix_encoding')
+
+WORDS = ('žluťoučký kůň úpěl ďábelské ódy, příliš šťastná čeřící se řeka, '
+         'Načíst obsah, Prázdný obsah, Zkopírováno, Nepodařilo se načíst, '
+         'úspěšně načten, znaků, Kopírovat log, Vymazat log, poslední chyby').split()
+STYLE_VALUES = (
+    'margin: 0 0 8px 0; font-size: 12px; color: #6b7280',
+    'display:flex;gap:8px',
+    'display: none;',
+    'color: #{c:06x}; margin: {n}px;',
+    'padding: {n}px {m}px; border-radius: 4px',
+    'font-weight: 600;  ',
+    'background: url(data:image/gif;base64,R0lGODlhAQABAAAAACw=); width: {n}%',
+)
+
+
+# --- corpus ---------------------------------------------------------------
+
+def czech_text(rnd, length):
+    words = []
+    size = 0
+    while size < length:
+        word = rnd.choice(WORDS)
+        words.append(word)
+        size += len(word.encode('utf-8')) + 1
+    return ' '.join(words)
+
+
+def write_html(path, size, styles, rnd, rule_styles):
+    """Page of about `size` bytes with `styles` style= attributes (some from the rule table)"""
+    per_tag = max(40, size // max(styles, 1))
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write('<!DOCTYPE html>\n<html lang="cs">\n<head><meta charset="utf-8"><title>Benchmark</title></head>\n<body>\n')
+        for n in range(styles):
+            roll = rnd.random()
+            if roll < 0.3 and rule_styles:
+                style = rnd.choice(rule_styles)
+            else:
+                style = rnd.choice(STYLE_VALUES).format(c=rnd.randrange(0xffffff), n=n % 50, m=n % 7)
+            cls = ' class="card"' if roll > 0.8 else ''
+            text = czech_text(rnd, per_tag - len(style) - 30)
+            if n % 500 == 499:
+                # HTML inside a script string - the tools rewrite these too
+                f.write(f"<script>el.innerHTML = '<span style=\"{style}\">{text}</span>';</script>\n")
+            else:
+                f.write(f'<div{cls} style="{style}">{text}</div>\n')
+        f.write('</body>\n</html>\n')
+
+
+def write_mojibake_js(path, size, rnd, fixes):
+    """JS where known strings appear double-encoded (UTF-8 read as cp1252), mixed with clean Czech"""
+    pairs = list(fixes.items())
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        n = 0
+        while written < size:
+            broken, _ = rnd.choice(pairs)
+            line = f"showMessage('{broken} {czech_text(rnd, 60)}', {n});\n"
+            f.write(line)
+            written += len(line.encode('utf-8'))
+            n += 1
+
+
+def generate(root, size_mb, styles, seed):
+    from fix_encoding import fixes
+    from style_rules import DEFAULT_RULES_PATH
+
+    rnd = random.Random(seed)
+    rule_styles = [r['style'] for r in json.loads(DEFAULT_RULES_PATH.read_text(encoding='utf-8'))['rules'] if 'style' in r]
+    size = int(size_mb * 1024 * 1024)
+    (root / 'css').mkdir(parents=True)
+    (root / 'js').mkdir()
+    (root / 'css' / 'styles.css').write_text('body { margin: 0; font-family: system-ui; }\n.card { padding: 8px; }\n',
+                                             encoding='utf-8')
+    write_html(root / 'html_studio.html', size, styles, rnd, rule_styles)
+    write_mojibake_js(root / 'js' / 'MenuModals.js', max(size // 10, 64 * 1024), rnd, fixes)
+
+
+# --- single run (child process) -------------------------------------------
+
+def run_tool(tool, root):
+    """Runs one tool on the corpus in `root`; returns list of files it wrote"""
+    html = root / 'html_studio.html'
+    css = root / 'css' / 'styles.css'
+    registry = root / 'css' / 'class-registry.json'
+    if tool == 'convert_inline_styles':
+        from convert_inline_styles import convert_file
+        convert_file(html, css, registry)
+        return [html, css]
+    if tool == 'move_inline_to_css':
+        from class_registry import ClassRegistry
+        from move_inline_to_css import process_file
+        reg = ClassRegistry(registry)
+        reg.import_css(css.read_text(encoding='utf-8'))
+        result = process_file(html, reg.snapshot())
+        for decl, cls in result['classes'].items():
+            reg.register(decl, cls)
+        reg.write_css(css)
+        reg.save()
+        return [html, css]
+    if tool == 'replace_inline_styles_regex':
+        from replace_inline_styles_regex import process_file
+        from style_rules import load_rules
+        process_file(html, load_rules())
+        return [html]
+    if tool == 'fix_encoding':
+        from fix_encoding import fix_text
+        js = root / 'js' / 'MenuModals.js'
+        js.write_text(fix_text(js.read_text(encoding='utf-8')), encoding='utf-8')
+        return [js]
+    raise ValueError(f'unknown tool {tool}')
+
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:         # no resource module on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def child(tool, root):
+    root = Path(root)
+    start = time.perf_counter()
+    written = run_tool(tool, root)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'seconds': elapsed,
+        'peak_mb': peak_memory_mb(),
+        'outputs': {p.relative_to(root).as_posix(): content_hash(p.read_bytes()) for p in written},
+    }))
+
+
+# --- driver ---------------------------------------------------------------
+
+def measure(tool, corpus, workdir, repeat):
+    runs = []
+    for i in range(repeat):
+        root = workdir / f'{tool}-{i}'
+        shutil.copytree(corpus, root)
+        proc = subprocess.run([sys.executable, __file__, '--run-one', tool, str(root)],
+                              capture_output=True, text=True, cwd=TOOLS_DIR)
+        shutil.rmtree(root)
+        if proc.returncode != 0:
+            raise RuntimeError(f'{tool} failed:\n{proc.stderr}')
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    best = min(runs, key=lambda r: r['seconds'])
+    best['stable'] = all(r['outputs'] == best['outputs'] for r in runs)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the HTML/CSS tools on a synthetic corpus')
+    parser.add_argument('--size-mb', type=float, default=10, help='size of the generated HTML page')
+    parser.add_argument('--styles', type=int, default=100_000, help='style= attributes in the page')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=1, help='runs per tool (best time is reported)')
+    parser.add_argument('--tools', nargs='+', choices=TOOLS, default=list(TOOLS))
+    parser.add_argument('--save-baseline', action='store_true', help='store output hashes for later comparison')
+    parser.add_argument('--run-one', nargs=2, metavar=('TOOL', 'DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        child(*args.run_one)
+        return
+
+    key = f'size{args.size_mb:g}-styles{args.styles}-seed{args.seed}'
+    baseline_path = CACHE_DIR / f'bench-baseline-{key}.json'
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else {}
+
+    with tempfile.TemporaryDirectory(prefix='bench-tools-') as tmp:
+        workdir = Path(tmp)
+        corpus = workdir / 'corpus'
+        start = time.perf_counter()
+        generate(corpus, args.size_mb, args.styles, args.seed)
+        html_size = (corpus / 'html_studio.html').stat().st_size
+        js_size = (corpus / 'js' / 'MenuModals.js').stat().st_size
+        print(f'Corpus {key}: html_studio.html {html_size / 1e6:.1f} MB, MenuModals.js {js_size / 1e6:.1f} MB '
+              f'(generated in {time.perf_counter() - start:.1f} s)\n')
+
+        print(f"{'tool':<30} {'time s':>8} {'MB/s':>7} {'peak MB':>8}  output")
+        results = {}
+        for tool in args.tools:
+            r = results[tool] = measure(tool, corpus, workdir, args.repeat)
+            expected = baseline.get(tool)
+            if expected is None:
+                status = 'no baseline'
+            else:
+                status = 'same as baseline' if expected == r['outputs'] else 'DIFFERS from baseline'
+            if not r['stable']:
+                status += ', NOT deterministic'
+            size = js_size if tool == 'fix_encoding' else html_size
+            peak = f"{r['peak_mb']:8.1f}" if r['peak_mb'] is not None else f"{'n/a':>8}"
+            print(f"{tool:<30} {r['seconds']:8.3f} {size / 1e6 / r['seconds']:7.1f} {peak}  {status}")
+
+    if 'convert_inline_styles' in results and 'move_inline_to_css' in results:
+        same = results['convert_inline_styles']['outputs'] == results['move_inline_to_css']['outputs']
+        print(f"\nconvert_inline_styles vs move_inline_to_css: {'identical output' if same else 'outputs differ'}")
+
+    if args.save_baseline:
+        baseline.update({tool: r['outputs'] for tool, r in results.items()})
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(baseline, indent=1, sort_keys=True) + '\n', encoding='utf-8')
+        print(f'Baseline saved to {baseline_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+Build stage: minifikované HTML/CSS a assety s otiskem obsahu v názvu.
+
+Výstup jde do build/ (zdrojové soubory zůstávají beze změny):
+- CSS se minifikuje a dostane název styles.<hash>.css; url()/@import uvnitř
+  se nejdřív přepíšou na otisknuté názvy, takže hash pokrývá i závislosti.
+- Obrázky, fonty a klasické <script src> skripty se jen zkopírují pod
+  otisknutým názvem. ES moduly (type="module") si importují sousedy relativní
+  cestou, takže se kopírují pod původním jménem i s importovanými moduly.
+- Každá stránka se minifikuje a odkazy (href/src, i s ?v=... cache-bustery)
+  se přepíšou přes html_rewriter.
+- build/asset-manifest.json mapuje zdroj -> výstup a Cache-Control hlavičku
+  (otisknuté soubory: immutable na rok, HTML a moduly: no-cache).
+
+Inkrementálně: klíč položky = hash zdroje + výstupy jejích závislostí + verze
+nástroje; pokud se nezměnil a výstup existuje, nic se nepřepisuje.
+
+    python tools/build_assets.py [-o build] [-j N] [--force]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+from functools import partial
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from html_rewriter import rewrite
+from incremental import content_hash, run_parallel, default_jobs
+
+ROOT = Path(__file__).resolve().parents[1]
+BUILD_DIR = ROOT / 'build'
+MANIFEST_NAME = 'asset-manifest.json'
+SKIP_DIRS = {'node_modules', 'dist', 'build', '.git', '.cache', 'archive'}
+URL_ATTRS = ('href', 'src', 'poster')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+NO_CACHE = 'no-cache'
+TOOL_VERSION = content_hash(Path(__file__).read_bytes() + Path(__file__).with_name('html_rewriter.py').read_bytes())
+
+_CSS_TOKEN_RE = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*!.*?\*/)|/\*.*?\*/|(\s+)''', re.DOTALL)
+_CSS_PUNCT_RE = re.compile(r'\s*([{};,>])\s*')
+_CSS_URL_RE = re.compile(r'''url\(\s*(['"]?)([^'")\s]+)\1\s*\)|@import\s+(['"])([^'"]+)\3''')
+_HTML_RAW_RE = re.compile(r'''<(pre|textarea|script|style)\b[^>]*>.*?</\1\s*>|<!--(?!\[if).*?-->'''
+                          r'''|(<[A-Za-z/!][^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*>)|(\s+)''',
+                          re.DOTALL | re.IGNORECASE)
+_IMPORT_RE = re.compile(r'''(?:\bimport|\bexport)\s[^'";]*?\bfrom\s*['"](\.{1,2}/[^'"]+)['"]'''
+                        r'''|\bimport\s*\(?\s*['"](\.{1,2}/[^'"]+)['"]''')
+
+
+def minify_css(text):
+    """Odstraní komentáře (kromě /*! */) a nadbytečné mezery; řetězce nechá beze změny"""
+    pieces = []             # (kód?, text) - řetězce a /*! */ se nesmí minifikovat
+    pos = 0
+    for m in _CSS_TOKEN_RE.finditer(text):
+        pieces.append((True, text[pos:m.start()]))
+        if m.group(1) or m.group(2):
+            pieces.append((False, m.group()))
+        else:
+            pieces.append((True, ' '))
+        pos = m.end()
+    pieces.append((True, text[pos:]))
+
+    out = []
+    code = []
+    for is_code, piece in pieces + [(False, '')]:
+        if is_code:
+            code.append(piece)
+            continue
+        if code:
+            chunk = ' '.join(''.join(code).split()) if ''.join(code).strip() else (' ' if code[0] else '')
+            out.append(_CSS_PUNCT_RE.sub(r'\1', chunk).replace(';}', '}'))
+            code = []
+        out.append(piece)
+    return ''.join(out).strip()
+
+
+def minify_html(text):
+    """Sloučí bílé znaky mezi tagy a odstraní komentáře; tagy (atributy), <pre>, <textarea>
+    a <script> zůstanou beze změny, obsah <style> se minifikuje"""
+    def repl(m):
+        if m.group(3):
+            return '\n' if '\n' in m.group(3) else ' '
+        if m.group(1):
+            if m.group(1).lower() != 'style':
+                return m.group()
+            body = m.group()
+            start, end = body.index('>') + 1, body.lower().rindex('</style')
+            return body[:start] + minify_css(body[start:end]) + body[end:]
+        return '' if m.group().startswith('<!--') else m.group()
+    return _HTML_RAW_RE.sub(repl, text).strip() + '\n'
+
+
+def fingerprint(rel, data):
+    path = Path(rel)
+    return path.with_name(f'{path.stem}.{content_hash(data)[:8]}{path.suffix}').as_posix()
+
+
+def resolve_ref(url, base_dir, root=ROOT):
+    """Lokální soubor, na který odkazuje URL (nebo None pro externí/neexistující)"""
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path or url.startswith('#'):
+        return None
+    target = (root / parts.path.lstrip('/')) if parts.path.startswith('/') else (base_dir / parts.path)
+    try:
+        target = target.resolve()
+        target.relative_to(root)
+    except (OSError, ValueError):
+        return None
+    return target if target.is_file() else None
+
+
+def make_ref(url, target_rel, base_dir, root=ROOT):
+    """Nový odkaz ve stejném stylu (absolutní /... nebo relativní); ?query se zahodí, #fragment zůstane"""
+    parts = urlsplit(url)
+    if parts.path.startswith('/'):
+        new = '/' + target_rel
+    else:
+        new = os.path.relpath(root / target_rel, base_dir).replace(os.sep, '/')
+        if parts.path.startswith('./') and not new.startswith('.'):
+            new = './' + new
+    return new + (f'#{parts.fragment}' if parts.fragment else '')
+
+
+class Build:
+    def __init__(self, root=ROOT, out=BUILD_DIR, force=False):
+        self.root = Path(root).resolve()
+        self.out = Path(out).resolve()
+        self.manifest_path = self.out / MANIFEST_NAME
+        self.previous = {}
+        if not force and self.manifest_path.exists():
+            data = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+            if data.get('tool') == TOOL_VERSION:
+                self.previous = data.get('files', {})
+        self.files = {}          # zdroj (rel) -> záznam manifestu
+        self.built = 0
+
+    def rel(self, path):
+        return Path(path).relative_to(self.root).as_posix()
+
+    def _emit(self, rel, key, output, make_data, cache_control):
+        """Zapíše výstup, pokud se klíč změnil; starý výstup stejného zdroje smaže"""
+        prev = self.previous.get(rel)
+        if prev and prev['key'] == key and (self.out / prev['output']).exists():
+            self.files[rel] = prev
+            return prev['output']
+        data = make_data()
+        output = output(data) if callable(output) else output
+        target = self.out / output
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        if prev and prev['output'] != output and (self.out / prev['output']).exists():
+            (self.out / prev['output']).unlink()
+        self.files[rel] = {'output': output, 'key': key, 'size': len(data), 'cache_control': cache_control}
+        self.built += 1
+        return output
+
+    def asset(self, path, module=False):
+        """Obrázek/font/skript -> otisknutý název (moduly pod původním názvem i se závislostmi)"""
+        rel = self.rel(path)
+        if rel in self.files:
+            return self.files[rel]['output']
+        if path.suffix == '.css':
+            return self.stylesheet(path)
+        raw = path.read_bytes()
+        key = content_hash(raw + TOOL_VERSION.encode())
+        if module:
+            output = self._emit(rel, key, rel, lambda: raw, NO_CACHE)
+            for m in _IMPORT_RE.finditer(raw.decode('utf-8', errors='replace')):
+                dep = resolve_ref(m.group(1) or m.group(2), path.parent, self.root)
+                if dep is not None:
+                    self.asset(dep, module=True)
+            return output
+        return self._emit(rel, key, fingerprint(rel, raw), lambda: raw, IMMUTABLE)
+
+    def stylesheet(self, path):
+        rel = self.rel(path)
+        if rel in self.files:
+            return self.files[rel]['output']
+        self.files[rel] = {'output': rel}       # ochrana proti cyklickému @import
+        text = path.read_text(encoding='utf-8')
+        out_dir = (self.out / rel).parent
+        deps = []
+
+        def repl(m):
+            url = m.group(2) or m.group(4)
+            target = resolve_ref(url, path.parent, self.root)
+            if target is None:
+                return m.group()
+            new = self.asset(target)
+            deps.append(new)
+            ref = make_ref(url, new, out_dir, self.out)
+            return f'url({ref})' if m.group(2) else f'@import "{ref}"'
+
+        rewritten = _CSS_URL_RE.sub(repl, text)
+        key = content_hash(text.encode('utf-8') + '\0'.join(deps).encode() + TOOL_VERSION.encode())
+        del self.files[rel]
+        data = lambda: minify_css(rewritten).encode('utf-8')
+        return self._emit(rel, key, lambda d: fingerprint(rel, d), data, IMMUTABLE)
+
+    def collect_page_assets(self, path):
+        """Projde odkazy stránky a sestaví všechny assety; vrací mapu url -> výstup"""
+        refs = {}
+        text = path.read_text(encoding='utf-8')
+
+        def visit(tag):
+            module = tag.name.lower() == 'script' and (tag.get('type') or '').lower() == 'module'
+            for name in URL_ATTRS:
+                url = tag.get(name)
+                if not url or url in refs:
+                    continue
+                target = resolve_ref(url, path.parent, self.root)
+                if target is None or target.suffix in ('.html', '.htm'):
+                    continue
+                refs[url] = self.asset(target, module=module)
+
+        rewrite(text, visit)
+        return refs
+
+    def run(self, jobs=1):
+        pages = sorted(p for p in source_files(self.root) if p.suffix in ('.html', '.htm'))
+        page_refs = [self.collect_page_assets(p) for p in pages]
+        keys = [content_hash(p.read_bytes() + json.dumps(refs, sort_keys=True).encode() + TOOL_VERSION.encode())
+                for p, refs in zip(pages, page_refs)]
+        todo = []
+        for page, refs, key in zip(pages, page_refs, keys):
+            rel = self.rel(page)
+            prev = self.previous.get(rel)
+            if prev and prev['key'] == key and (self.out / rel).exists():
+                self.files[rel] = prev
+            else:
+                todo.append((page, refs, key))
+        results = run_parallel(partial(build_page, root=self.root, out=self.out), [(p, r) for p, r, _ in todo], jobs)
+        for (page, _, key), size in zip(todo, results):
+            self.files[self.rel(page)] = {'output': self.rel(page), 'key': key, 'size': size,
+                                          'cache_control': NO_CACHE}
+        self.built += len(todo)
+        self.prune()
+        self.save()
+        return len(pages), len(todo)
+
+    def prune(self):
+        """Smaže výstupy zdrojů, které už neexistují nebo na ně nic neodkazuje"""
+        for rel, entry in self.previous.items():
+            if rel not in self.files:
+                stale = self.out / entry['output']
+                if stale.exists():
+                    stale.unlink()
+
+    def save(self):
+        data = {
+            'tool': TOOL_VERSION,
+            'files': dict(sorted(self.files.items())),
+            'headers': {entry['output']: entry['cache_control'] for entry in self.files.values()},
+        }
+        self.out.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(data, indent=1) + '\n', encoding='utf-8')
+        os.replace(tmp, self.manifest_path)
+
+
+def build_page(item, root=ROOT, out=BUILD_DIR):
+    """Minifikuje stránku a přepíše odkazy na otisknuté assety; vrací velikost výstupu"""
+    page, refs = item
+    rel = page.relative_to(root)
+    out_dir = (out / rel).parent
+
+    def relink(tag):
+        for name in URL_ATTRS:
+            url = tag.get(name)
+            if url in refs:
+                tag.set(name, make_ref(url, refs[url], out_dir, out))
+
+    html, _ = rewrite(page.read_text(encoding='utf-8'), relink)
+    data = minify_html(html).encode('utf-8')
+    target = out / rel
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(data)
+    return len(data)
+
+
+def source_files(root=ROOT):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for name in filenames:
+            yield Path(dirpath) / name
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Minify HTML/CSS and fingerprint assets into a build directory')
+    parser.add_argument('-o', '--out', type=Path, default=BUILD_DIR)
+    parser.add_argument('-j', '--jobs', type=int, default=default_jobs(), help='parallel page workers')
+    parser.add_argument('--force', action='store_true', help='ignore the previous build manifest')
+    parser.add_argument('--clean', action='store_true', help='delete the output directory first')
+    args = parser.parse_args()
+
+    if args.clean and args.out.exists():
+        shutil.rmtree(args.out)
+    build = Build(ROOT, args.out, force=args.force)
+    pages, rebuilt = build.run(args.jobs)
+    assets = len(build.files) - pages
+    src = sum((ROOT / rel).stat().st_size for rel in build.files)
+    dst = sum(entry['size'] for entry in build.files.values())
+    print(f"{pages} pages ({rebuilt} rebuilt), {assets} assets, {build.built} files written; "
+          f"{src} -> {dst} bytes. Manifest: {os.path.relpath(build.manifest_path)}")
+
+
+if __name__ == '__main__':
+    main()
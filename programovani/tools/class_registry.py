@@ -0,0 +1,331 @@
+"""
+Perzistentní registr generovaných CSS tříd (inl-*) pro styles.css.
+
+- Deklarace se normalizují (mezery, velká písmena v názvech vlastností,
+  koncové středníky, !important) a vlastnosti se seřadí, pokud na pořadí
+  nezáleží (žádná vlastnost se neopakuje ani nepřekrývá se zkratkou podle
+  _SHORTHANDS, ani logická s fyzickou) - ekvivalentní styly tak dostanou
+  jednu třídu.
+- Nové třídy mají jednotný název inl- + sha1[:8] z normalizované deklarace;
+  starší názvy (md5[:6] z move_inline_to_css) zůstávají, dokud je registr zná.
+- Generované třídy se v styles.css drží v jednom spravovaném bloku; slepé
+  přílepky starších běhů se při synchronizaci převezmou a sloučí. Pravidla
+  uvnitř @media/@supports zůstanou, jak jsou; ručně upravené inl-* pravidlo
+  se liší od registru -> varování, platí registr.
+- `sync` sloučí duplicitní třídy (přepíše odkazy v HTML/JS na jednu)
+  a odstraní třídy, na které už nic neodkazuje. Do té doby zůstává sloučená
+  třída ve spravovaném bloku jako další selektor (.inl-a, .inl-b { ... }).
+
+    python tools/class_registry.py sync [--dry-run] [--no-purge]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+from functools import partial
+from pathlib import Path
+
+from incremental import run_parallel, default_jobs
+
+ROOT = Path(__file__).resolve().parents[1]
+CSS_PATH = ROOT / 'css' / 'styles.css'
+REGISTRY_PATH = ROOT / 'css' / 'class-registry.json'
+SCAN_SUFFIXES = ('.html', '.js')
+SKIP_DIRS = {'node_modules', 'dist', '.git', '.cache', 'archive'}
+
+BLOCK_START = '/* BEGIN generated inline-style classes (tools/class_registry.py) */'
+BLOCK_END = '/* END generated inline-style classes */'
+
+CLASS_RE = re.compile(r'\binl-[0-9a-f]{6,8}\b')
+_RULE_RE = re.compile(r'^[ \t]*\.(inl-[0-9a-f]{6,8})((?:\s*,\s*\.inl-[0-9a-f]{6,8})*)\s*\{([^{}]*)\}[ \t]*\n?',
+                      re.MULTILINE)
+_LEGACY_HEADER_RE = re.compile(r'^\n?/\* (?:Auto-converted inline styles|Generated classes moved from inline styles) \*/[ \t]*\n',
+                               re.MULTILINE)
+_BLOCK_RE = re.compile(re.escape(BLOCK_START) + r'.*?' + re.escape(BLOCK_END) + r'\n?', re.DOTALL)
+_IMPORTANT_RE = re.compile(r'\s*!\s*important\s*$', re.IGNORECASE)
+_BRACE_RE = re.compile(r'/\*.*?\*/|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|[{}]', re.DOTALL)
+
+
+def split_declarations(style):
+    """Rozdělí deklarace podle ';' mimo závorky a uvozovky (url(data:...;base64,...))"""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(style):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth = max(0, depth - 1)
+        elif ch == ';' and depth == 0:
+            parts.append(style[start:i])
+            start = i + 1
+    parts.append(style[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+_SIDES = ('top', 'right', 'bottom', 'left')
+_LOGICAL_SIDES = ('block', 'inline', 'block-start', 'block-end', 'inline-start', 'inline-end')
+_CORNERS = ('top-left', 'top-right', 'bottom-right', 'bottom-left',
+            'start-start', 'start-end', 'end-start', 'end-end')
+_GRID_LINES = ('grid-row', 'grid-column', 'grid-row-start', 'grid-row-end',
+               'grid-column-start', 'grid-column-end')
+# Zkratka -> dílčí vlastnosti, které nezačínají jejím názvem (ty s prefixem
+# zkratka- pozná _overlaps sama: margin/margin-top, border/border-top-width)
+_SHORTHANDS = {
+    'font': {'line-height'},
+    'inset': set(_SIDES),
+    'gap': {'row-gap', 'column-gap'},
+    'grid-gap': {'row-gap', 'column-gap'},
+    'grid-area': set(_GRID_LINES),
+    'place-content': {'align-content', 'justify-content'},
+    'place-items': {'align-items', 'justify-items'},
+    'place-self': {'align-self', 'justify-self'},
+    'flex-flow': {'flex-direction', 'flex-wrap'},
+    'columns': {'column-width', 'column-count'},
+    'border-radius': {f'border-{c}-radius' for c in _CORNERS},
+    'white-space': {'white-space-collapse', 'text-wrap', 'text-wrap-mode'},
+    **{f'border-{kind}': {f'border-{side}-{kind}' for side in _SIDES + _LOGICAL_SIDES}
+       for kind in ('color', 'style', 'width')},
+    **{f'inset-{side}': set(_SIDES) for side in _LOGICAL_SIDES},
+    **{f'{m}{axis}-size': {f'{m}width', f'{m}height'}
+       for m in ('', 'min-', 'max-') for axis in ('inline', 'block')},
+}
+# margin-inline-start vs. margin-left: podle writing-mode jde o stejnou hodnotu
+_BOX_SIDE_RE = re.compile(r'^(margin|padding|border|scroll-margin|scroll-padding)-(?:(top|right|bottom|left)|block|inline)\b')
+
+
+def _same_box_side(a, b):
+    ma, mb = _BOX_SIDE_RE.match(a), _BOX_SIDE_RE.match(b)
+    return bool(ma and mb and ma.group(1) == mb.group(1) and bool(ma.group(2)) != bool(mb.group(2)))
+
+
+def _overlaps(props):
+    # margin vs. margin-top, font vs. line-height, nebo opakovaná vlastnost
+    # (fallbacky) -> pořadí je významné
+    if len(set(props)) != len(props):
+        return True
+    if 'all' in props and len(props) > 1:
+        return True
+    return any(a != b and (b.startswith(a + '-') or b in _SHORTHANDS.get(a, ()) or _same_box_side(a, b))
+               for a in props for b in props)
+
+
+def normalize(style):
+    """Kanonický tvar deklarace: 'prop: value; prop2: value2;' (None pro prázdný styl)"""
+    decls = []
+    for part in split_declarations(style):
+        prop, sep, value = part.partition(':')
+        if not sep:
+            decls.append((part.strip(), None))
+            continue
+        value = ' '.join(value.split())
+        value = _IMPORTANT_RE.sub(' !important', value)
+        prop = prop.strip()
+        decls.append((prop if prop.startswith('--') else prop.lower(), value))
+    if not decls:
+        return None
+    if not _overlaps([p for p, _ in decls]):
+        decls.sort()
+    return ' '.join(f'{p}: {v};' if v is not None else f'{p};' for p, v in decls)
+
+
+def top_level_rules(css_text):
+    """inl-* pravidla mimo @media/@supports/...; vnořená registr nespravuje ani nemaže"""
+    depth = 0
+    tokens = _BRACE_RE.finditer(css_text)
+    token = next(tokens, None)
+    for m in _RULE_RE.finditer(css_text):
+        while token is not None and token.start() < m.start():
+            if token.group() == '{':
+                depth += 1
+            elif token.group() == '}':
+                depth = max(0, depth - 1)
+            token = next(tokens, None)
+        if depth == 0:
+            yield m
+
+
+def class_name(canonical):
+    return 'inl-' + hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:8]
+
+
+class ClassRegistry:
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = Path(path)
+        self.classes = {}       # class -> canonical declaration
+        self.aliases = {}       # sloučená třída -> ponechaná (odkazy přepíše až sync)
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            self.classes = data.get('classes', {})
+            self.aliases = data.get('aliases', {})
+        self.by_decl = {}
+        for cls, decl in sorted(self.classes.items()):
+            self.by_decl.setdefault(decl, cls)
+
+    def snapshot(self):
+        """Mapa kanonická deklarace -> třída (pro workery v process poolu)"""
+        return dict(self.by_decl)
+
+    def class_for(self, style):
+        """Třída pro obsah style atributu; nová deklarace se zaregistruje. None pro prázdný styl."""
+        canonical = normalize(style)
+        if canonical is None:
+            return None
+        cls = self.by_decl.get(canonical)
+        if cls is None:
+            cls = self.register(canonical, class_name(canonical))
+        return cls
+
+    def register(self, canonical, cls):
+        """Zaregistruje třídu; pro již známou deklaraci vrátí existující název"""
+        existing = self.by_decl.get(canonical)
+        if existing is not None:
+            return existing
+        self.classes[cls] = canonical
+        self.by_decl[canonical] = cls
+        return cls
+
+    def import_css(self, css_text):
+        """Převezme inl-* pravidla ze styles.css; duplicity zapíše do self.aliases"""
+        merged = 0
+        for m in top_level_rules(css_text):
+            cls, canonical = m.group(1), normalize(m.group(3))
+            if canonical is None:
+                continue
+            if cls in self.classes and self.classes[cls] != canonical:
+                # Ručně upravená třída v CSS - registr má přednost, blok se přepíše
+                print(f"warning: .{cls} in styles.css differs from the registry, keeping the registry version "
+                      f"(edit the inline style or drop the class from {self.path.name} instead)\n"
+                      f"  css:      {canonical}\n  registry: {self.classes[cls]}")
+                continue
+            kept = self.register(canonical, cls)
+            # .inl-a, .inl-b { ... } - sloučené třídy z bloku, jehož odkazy sync ještě nepřepsal
+            for alias in [cls] + CLASS_RE.findall(m.group(2)):
+                if alias != kept and alias not in self.aliases and alias not in self.classes:
+                    self.aliases[alias] = kept
+                    merged += 1
+        return merged
+
+    def drop(self, classes):
+        for cls in classes:
+            canonical = self.classes.pop(cls, None)
+            if canonical is not None and self.by_decl.get(canonical) == cls:
+                del self.by_decl[canonical]
+
+    def css_block(self):
+        # Sloučené třídy zůstávají v selektoru, dokud sync nepřepíše odkazy v HTML/JS
+        merged = {}
+        for alias, kept in sorted(self.aliases.items()):
+            merged.setdefault(kept, []).append(alias)
+        lines = [BLOCK_START]
+        lines += [', '.join(f'.{c}' for c in [cls] + merged.get(cls, [])) + f' {{ {decl} }}'
+                  for cls, decl in sorted(self.classes.items())]
+        lines.append(BLOCK_END)
+        return '\n'.join(lines) + '\n'
+
+    def render_css(self, css_text):
+        """styles.css bez volných inl-* pravidel, s jedním spravovaným blokem na konci"""
+        rest = _BLOCK_RE.sub('', css_text)
+        pos, kept = 0, []
+        for m in top_level_rules(rest):
+            kept.append(rest[pos:m.start()])
+            pos = m.end()
+        rest = ''.join(kept) + rest[pos:]
+        rest = _LEGACY_HEADER_RE.sub('', rest).rstrip('\n')
+        if not self.classes:
+            return rest + '\n'
+        return rest + '\n\n' + self.css_block()
+
+    def write_css(self, css_path=CSS_PATH):
+        css_path = Path(css_path)
+        css_text = css_path.read_text(encoding='utf-8') if css_path.exists() else ''
+        new_css = self.render_css(css_text)
+        if new_css != css_text:
+            css_path.write_text(new_css, encoding='utf-8')
+        return len(css_text.encode('utf-8')) - len(new_css.encode('utf-8'))
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        data = {'version': 1, 'classes': dict(sorted(self.classes.items())),
+                'aliases': dict(sorted(self.aliases.items()))}
+        tmp.write_text(json.dumps(data, indent=1, ensure_ascii=False) + '\n', encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+def source_files(root=ROOT):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for name in filenames:
+            if name.endswith(SCAN_SUFFIXES):
+                yield Path(dirpath) / name
+
+
+def scan_file(path, aliases, dry_run=False):
+    """Vrátí třídy inl-* použité v souboru; zároveň přepíše odkazy na sloučené aliasy"""
+    text = path.read_bytes().decode('utf-8', errors='surrogateescape')
+    used = set(CLASS_RE.findall(text))
+    renamed = 0
+    if aliases and used & aliases.keys():
+        def rename(m):
+            nonlocal renamed
+            new = aliases.get(m.group())
+            if new is None:
+                return m.group()
+            renamed += 1
+            return new
+        text = CLASS_RE.sub(rename, text)
+        used = {aliases.get(c, c) for c in used}
+        if renamed and not dry_run:
+            path.write_bytes(text.encode('utf-8', errors='surrogateescape'))
+    return path, used, renamed
+
+
+def sync(dry_run=False, purge=True, jobs=1, css_path=CSS_PATH, registry_path=REGISTRY_PATH, root=ROOT):
+    registry = ClassRegistry(registry_path)
+    css_text = Path(css_path).read_text(encoding='utf-8') if Path(css_path).exists() else ''
+    registry.import_css(css_text)
+    # Aliasy i z dřívějších běhů convert/move nástrojů, které odkazy nepřepisují;
+    # po přepsání odkazů už je spravovaný blok nepotřebuje
+    aliases, registry.aliases = registry.aliases, {}
+    results = run_parallel(partial(scan_file, aliases=aliases, dry_run=dry_run),
+                           sorted(source_files(root)), jobs)
+    used = set().union(*(r[1] for r in results)) if results else set()
+    renamed = sum(r[2] for r in results)
+
+    unused = sorted(c for c in registry.classes if c not in used) if purge else []
+    registry.drop(unused)
+
+    new_css = registry.render_css(css_text)
+    saved = len(css_text.encode('utf-8')) - len(new_css.encode('utf-8'))
+    for path, _, count in results:
+        if count:
+            print(f"{'would rewrite' if dry_run else 'rewrote'} {count} references in {path.relative_to(root)}")
+    print(f"Merged {len(aliases)} duplicate classes ({renamed} references), {'would purge' if dry_run else 'purged'} "
+          f"{len(unused)} unused, {len(registry.classes)} classes kept, CSS {saved:+d} bytes saved"
+          f"{' (dry run)' if dry_run else ''}.")
+    if not dry_run:
+        if new_css != css_text:
+            Path(css_path).write_text(new_css, encoding='utf-8')
+        registry.save()
+    return registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generated CSS class registry for styles.css')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sync_cmd = sub.add_parser('sync', help='import CSS, merge duplicate classes, purge unused ones')
+    sync_cmd.add_argument('-n', '--dry-run', action='store_true')
+    sync_cmd.add_argument('--no-purge', action='store_true', help='keep classes nothing references')
+    sync_cmd.add_argument('-j', '--jobs', type=int, default=default_jobs())
+    args = parser.parse_args()
+    if args.command == 'sync':
+        sync(dry_run=args.dry_run, purge=not args.no_purge, jobs=args.jobs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Dávkové úpravy velkých souborů přes offsety (codemody pro AIPanel.js apod.).
+
+Místo `del lines[...]` / `lines.insert(...)` s natvrdo zadanými čísly řádků:
+1. všechny kotvy (řetězce nebo regexy) se najdou jedním průchodem souborem,
+2. úpravy se sbírají jako rozsahy [start, end) v původním textu - pozice
+   se tedy neposouvají, ať se úpravy přidávají v jakémkoli pořadí,
+3. překrývající se úpravy se odmítnou (EditConflict) dřív, než se cokoli zapíše,
+4. vše se aplikuje jedním lineárním průchodem (skládání po částech + join).
+
+Dry-run vypíše unified diff místo zápisu.
+
+    tx = EditTransaction(text)
+    found = tx.locate({'push': "this.chatHistory.push({", 'end': re.compile(r'^\\s*}\\);$', re.M)})
+    for start, _ in found['push']:
+        tx.replace(start, tx.line_end(start), 'nový řádek\\n', label='push')
+    new_text = tx.apply()
+"""
+import argparse
+import difflib
+import os
+import re
+from pathlib import Path
+
+
+_SCOPED_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+
+
+class EditConflict(ValueError):
+    pass
+
+
+class Edit:
+    __slots__ = ('start', 'end', 'text', 'label', 'order')
+
+    def __init__(self, start, end, text, label, order):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.label = label
+        self.order = order
+
+    def __repr__(self):
+        return f'<Edit {self.label!r} [{self.start}, {self.end})>'
+
+
+class EditTransaction:
+    def __init__(self, text):
+        self.text = text
+        self.edits = []
+
+    # --- hledání -----------------------------------------------------------
+
+    def locate(self, anchors):
+        """Najde všechny kotvy jedním průchodem; vrací {název: [(start, end), ...]}.
+
+        Kotva je řetězec (hledá se doslovně) nebo zkompilovaný regex. Výskyty
+        se nepřekrývají - kotva uvnitř delší nalezené kotvy se nenajde.
+        """
+        names = list(anchors)
+        parts = []
+        for i, name in enumerate(names):
+            anchor = anchors[name]
+            if isinstance(anchor, str):
+                pattern = re.escape(anchor)
+            else:
+                # Příznaky platí jen pro vlastní alternativu: (?ms:...)
+                scoped = ''.join(letter for flag, letter in _SCOPED_FLAGS if anchor.flags & flag)
+                pattern = f'(?{scoped}:{anchor.pattern})' if scoped else anchor.pattern
+            parts.append(f'(?P<a{i}>{pattern})')
+        found = {name: [] for name in names}
+        if not parts:
+            return found
+        for m in re.finditer('|'.join(parts), self.text):
+            found[names[int(m.lastgroup[1:])]].append(m.span())
+        return found
+
+    def line_start(self, pos):
+        return self.text.rfind('\n', 0, pos) + 1
+
+    def line_end(self, pos, lines=1):
+        """Konec řádku s pozicí `pos` (včetně '\\n'); lines > 1 zahrne i následující řádky"""
+        end = pos
+        for _ in range(lines):
+            nl = self.text.find('\n', end)
+            if nl == -1:
+                return len(self.text)
+            end = nl + 1
+        return end
+
+    def line_number(self, pos):
+        return self.text.count('\n', 0, pos) + 1
+
+    # --- úpravy ------------------------------------------------------------
+
+    def replace(self, start, end, text, label=None):
+        if not 0 <= start <= end <= len(self.text):
+            raise ValueError(f'Edit {label!r}: range [{start}, {end}) outside of the text')
+        self.edits.append(Edit(start, end, text, label or f'edit #{len(self.edits) + 1}', len(self.edits)))
+
+    def insert(self, pos, text, label=None):
+        self.replace(pos, pos, text, label)
+
+    def delete(self, start, end, label=None):
+        self.replace(start, end, '', label)
+
+    def replace_lines(self, pos, count, text, label=None):
+        """Nahradí `count` celých řádků počínaje řádkem s pozicí `pos`"""
+        start = self.line_start(pos)
+        self.replace(start, self.line_end(start, count), text, label)
+
+    # --- aplikace ----------------------------------------------------------
+
+    def _sorted(self):
+        # Vložení na stejné místo zůstanou v pořadí přidání, vložení před nahrazením
+        edits = sorted(self.edits, key=lambda e: (e.start, e.end > e.start, e.order))
+        for prev, cur in zip(edits, edits[1:]):
+            if cur.start < prev.end:
+                raise EditConflict(
+                    f'{prev.label!r} (line {self.line_number(prev.start)}) overlaps '
+                    f'{cur.label!r} (line {self.line_number(cur.start)})')
+        return edits
+
+    def apply(self):
+        """Ověří, že se úpravy nepřekrývají, a aplikuje je jedním průchodem"""
+        chunks = []
+        pos = 0
+        for edit in self._sorted():
+            chunks.append(self.text[pos:edit.start])
+            chunks.append(edit.text)
+            pos = edit.end
+        chunks.append(self.text[pos:])
+        return ''.join(chunks)
+
+    def diff(self, name='file'):
+        new = self.apply()
+        return ''.join(difflib.unified_diff(self.text.splitlines(True), new.splitlines(True),
+                                            f'a/{name}', f'b/{name}'))
+
+
+def apply_file(path, build, dry_run=False, encoding='utf-8'):
+    """Načte soubor, zavolá build(tx) pro sběr úprav a zapíše výsledek (nebo vypíše diff).
+
+    Konce řádků se zachovají (newline=''). Vrací počet úprav.
+    """
+    path = Path(path)
+    with open(path, encoding=encoding, newline='') as f:
+        tx = EditTransaction(f.read())
+    build(tx)
+    if not tx.edits:
+        return 0
+    if dry_run:
+        print(tx.diff(path.name), end='')
+        return len(tx.edits)
+    new_text = tx.apply()
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding=encoding, newline='') as f:
+        f.write(new_text)
+    os.replace(tmp, path)
+    return len(tx.edits)
+
+
+def run_codemod(build, default_path, description):
+    """Společné CLI codemod skriptů: [cesta] [-n/--dry-run]"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('path', nargs='?', type=Path, default=default_path)
+    parser.add_argument('-n', '--dry-run', action='store_true', help='print a unified diff, write nothing')
+    args = parser.parse_args()
+    try:
+        count = apply_file(args.path, build, args.dry_run)
+    except EditConflict as e:
+        raise SystemExit(f'❌ Konflikt úprav, nic nezapsáno: {e}')
+    return count, args
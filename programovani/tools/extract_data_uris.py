@@ -0,0 +1,263 @@
+"""
+Vytáhne všechny inlinované data: URI z HTML/CSS do samostatných souborů
+pojmenovaných podle obsahu (cacheovatelné prohlížečem).
+
+- Soubory se procházejí přes mmap; payload se dekóduje po blocích rovnou
+  do dočasného souboru (base64 i %-kódování), velké řetězce se nevytváří.
+- Výstupní název = sha256 dekódovaného obsahu + přípona podle MIME typu,
+  takže stejné obrázky/fonty z různých stránek skončí v jednom souboru.
+- Odkaz se nahradí relativní cestou (z CSS relativně k CSS souboru)
+  a vypíše se, kolik bajtů se ze stránek ubralo.
+- URI kratší než --min-bytes zůstávají inline (další request by stál víc).
+- URI s poškozeným base64 zůstávají inline a vypíšou se s číslem řádku.
+
+    python tools/extract_data_uris.py [-n] [-j N] [--min-bytes 2048] [cesty...]
+"""
+import argparse
+import base64
+import binascii
+import hashlib
+import mimetypes
+import mmap
+import os
+import re
+from functools import partial
+from pathlib import Path
+from urllib.parse import unquote_to_bytes
+
+from incremental import run_parallel, default_jobs
+
+ROOT = Path(__file__).resolve().parents[1]
+ASSET_DIR = ROOT / 'assets' / 'extracted'
+SUFFIXES = ('.html', '.htm', '.css')
+SKIP_DIRS = {'node_modules', 'dist', '.git', '.cache', 'assets'}
+CHUNK = 1 << 16
+
+_HEADER_RE = re.compile(rb'data:([A-Za-z0-9.+-]+/[A-Za-z0-9.+-]+)?((?:;[A-Za-z0-9.+_-]+(?:=[^;,"\'()\s]+)?)*),')
+_BASE64_RE = re.compile(rb'[A-Za-z0-9+/=\s\\]*')
+_STRIP = b' \t\r\n\\'
+_EXTENSIONS = {
+    'application/json': '.json',
+    'application/manifest+json': '.webmanifest',
+    'image/svg+xml': '.svg',
+    'image/jpeg': '.jpg',
+    'image/x-icon': '.ico',
+    'image/vnd.microsoft.icon': '.ico',
+    'font/woff': '.woff',
+    'font/woff2': '.woff2',
+    'font/ttf': '.ttf',
+    'font/otf': '.otf',
+    'application/font-woff': '.woff',
+    'application/font-woff2': '.woff2',
+    'text/plain': '.txt',
+}
+
+
+def extension(mime):
+    mime = (mime or 'text/plain').lower()
+    return _EXTENSIONS.get(mime) or mimetypes.guess_extension(mime) or '.bin'
+
+
+def _terminator(buf, start):
+    """Znak, kterým URI končí, podle toho, co mu předchází (uvozovka, url( )"""
+    prev = buf[start - 1:start] if start else b''
+    if prev in (b'"', b"'"):
+        return prev
+    pos = start
+    while pos > 0 and buf[pos - 1:pos].isspace():
+        pos -= 1
+    if buf[max(0, pos - 4):pos].lower() == b'url(':
+        return b')'
+    return None
+
+
+def find_uris(buf, min_bytes=0):
+    """Generuje (start, konec, mime, base64, payload_start) pro každé extrahovatelné data: URI"""
+    pos = 0
+    while True:
+        m = _HEADER_RE.search(buf, pos)
+        if not m:
+            return
+        pos = m.end()
+        term = _terminator(buf, m.start())
+        if term is None:
+            continue        # srcset, text v JS... - bez jasného konce radši nesahat
+        is_b64 = m.group(2).lower().endswith(b';base64')
+        if is_b64:
+            end = _BASE64_RE.match(buf, m.end()).end()
+            # url( data ) - mezery před ')' nepatří k payloadu
+            while end > m.end() and buf[end - 1:end].isspace():
+                end -= 1
+            if buf[end:end + 1] != term and not (term == b')' and buf[end:end + 1].isspace()):
+                continue
+        else:
+            end = buf.find(term, m.end())
+            if end == -1:
+                continue
+        if end - m.end() < min_bytes:
+            continue
+        pos = end
+        yield m.start(), end, (m.group(1) or b'').decode('ascii'), is_b64, m.end()
+
+
+def _chunks(buf, start, end):
+    view = memoryview(buf)
+    try:
+        for pos in range(start, end, CHUNK):
+            yield bytes(view[pos:min(pos + CHUNK, end)])
+    finally:
+        view.release()
+
+
+def decode_to(buf, start, end, is_b64, out):
+    """Dekóduje payload buf[start:end] po blocích do `out`; vrací sha256 hexdigest"""
+    digest = hashlib.sha256()
+    carry = b''
+    for chunk in _chunks(buf, start, end):
+        if is_b64:
+            data = carry + chunk.translate(None, _STRIP)
+            cut = len(data) - len(data) % 4
+            carry, data = data[cut:], base64.b64decode(data[:cut])
+        else:
+            data = carry + chunk
+            # neúplná %XX sekvence na konci bloku počká na další blok
+            pct = data.rfind(b'%', max(0, len(data) - 2))
+            cut = pct if pct != -1 else len(data)
+            carry, data = data[cut:], unquote_to_bytes(data[:cut])
+        digest.update(data)
+        out.write(data)
+    if carry:
+        data = base64.b64decode(carry + b'=' * (-len(carry) % 4)) if is_b64 else unquote_to_bytes(carry)
+        digest.update(data)
+        out.write(data)
+    return digest.hexdigest()
+
+
+class _ByteCounter:
+    """Náhrada výstupního souboru pro --dry-run: jen sečte dekódované bajty"""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+
+def store_asset(buf, start, end, mime, is_b64, asset_dir, dry_run):
+    """Uloží payload jako <sha256[:16]><přípona>; vrací (cesta, velikost)"""
+    if dry_run:
+        counter = _ByteCounter()
+        sha = decode_to(buf, start, end, is_b64, counter)
+        return asset_dir / (sha[:16] + extension(mime)), counter.size
+    asset_dir.mkdir(parents=True, exist_ok=True)
+    tmp = asset_dir / f'.tmp-{os.getpid()}-{start}'
+    try:
+        with open(tmp, 'wb') as out:
+            sha = decode_to(buf, start, end, is_b64, out)
+        size = tmp.stat().st_size
+        target = asset_dir / (sha[:16] + extension(mime))
+        if not target.exists():
+            os.replace(tmp, target)     # paralelní workery zapisují stejný obsah - atomicky
+        return target, size
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def reference(path, asset):
+    return os.path.relpath(asset, path.parent).replace(os.sep, '/')
+
+
+def extract_file(path, asset_dir=ASSET_DIR, min_bytes=0, dry_run=False):
+    """Zpracuje jeden soubor; vrací souhrn pro report"""
+    result = {'path': path, 'uris': 0, 'saved': 0, 'assets': {}, 'skipped': 0, 'invalid': []}
+    if path.stat().st_size == 0:
+        return result
+    tmp = path.with_name(path.name + '.tmp')
+    out = None
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf.find(b'data:') == -1:
+                return result
+            pending = 0
+            out = None if dry_run else open(tmp, 'wb')
+            for start, end, mime, is_b64, payload in find_uris(buf, min_bytes):
+                if not is_b64 and path.suffix != '.css' and buf.find(b'&', payload, end) != -1:
+                    result['skipped'] += 1      # HTML entity v atributu - dekódování by nebylo přesné
+                    continue
+                try:
+                    asset, size = store_asset(buf, payload, end, mime, is_b64, asset_dir, dry_run)
+                except binascii.Error as e:
+                    # Poškozený base64 - URI zůstane inline, ostatní se zpracují dál
+                    result['invalid'].append((buf[:start].count(b'\n') + 1, str(e)))
+                    continue
+                ref = reference(path, asset).encode('utf-8')
+                result['uris'] += 1
+                result['saved'] += (end - start) - len(ref)
+                result['assets'][asset.name] = size
+                if out:
+                    for chunk in _chunks(buf, pending, start):
+                        out.write(chunk)
+                    out.write(ref)
+                pending = end
+            if out and result['uris']:
+                for chunk in _chunks(buf, pending, len(buf)):
+                    out.write(chunk)
+        if out:
+            out.close()
+            if result['uris']:
+                os.replace(tmp, path)
+    finally:
+        if out:
+            out.close()
+            if tmp.exists():
+                tmp.unlink()
+    return result
+
+
+def source_files(paths):
+    for base in paths:
+        base = Path(base)
+        if base.is_file():
+            yield base
+            continue
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for name in filenames:
+                if name.endswith(SUFFIXES):
+                    yield Path(dirpath) / name
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract inlined data: URIs into content-hashed asset files')
+    parser.add_argument('paths', nargs='*', default=[ROOT], help='files or directories (default: project root)')
+    parser.add_argument('-o', '--asset-dir', type=Path, default=ASSET_DIR)
+    parser.add_argument('--min-bytes', type=int, default=2048, help='leave smaller payloads inline')
+    parser.add_argument('-j', '--jobs', type=int, default=default_jobs())
+    parser.add_argument('-n', '--dry-run', action='store_true', help='report only, write nothing')
+    args = parser.parse_args()
+
+    files = sorted(source_files(args.paths))
+    worker = partial(extract_file, asset_dir=args.asset_dir.resolve(), min_bytes=args.min_bytes,
+                     dry_run=args.dry_run)
+    results = run_parallel(worker, [p.resolve() for p in files], args.jobs)
+
+    assets, refs, saved = {}, 0, 0
+    for r in results:
+        if r['uris']:
+            print(f"{'would extract' if args.dry_run else 'extracted'} {r['uris']} URIs from "
+                  f"{os.path.relpath(r['path'])}: -{r['saved']} bytes")
+        if r['skipped']:
+            print(f"  skipped {r['skipped']} entity-encoded URIs in {os.path.relpath(r['path'])}")
+        for line, error in r['invalid']:
+            print(f"  left invalid base64 URI inline in {os.path.relpath(r['path'])}:{line} ({error})")
+        refs += r['uris']
+        saved += r['saved']
+        assets.update(r['assets'])
+    print(f"{len(files)} files scanned, {refs} data: URIs -> {len(assets)} unique assets "
+          f"({sum(assets.values())} bytes decoded, {refs - len(assets)} duplicates), "
+          f"{saved} bytes removed from pages{' (dry run)' if args.dry_run else ''}.")
+
+
+if __name__ == '__main__':
+    main()
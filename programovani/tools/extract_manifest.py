@@ -1,14 +1,20 @@
-import re, base64
+import mmap
 from pathlib import Path
+
+from extract_data_uris import find_uris, decode_to
+
+# Special case of extract_data_uris.py: the PWA manifest keeps its well-known name
 p=Path('html_studio.html')
-s=p.read_text(encoding='utf-8')
-m=re.search(r'href="data:application/json;base64,([A-Za-z0-9+/=]+)"', s)
-if not m:
-    print('No base64 manifest found')
-else:
-    b64=m.group(1)
-    data=base64.b64decode(b64).decode('utf-8')
-    Path('manifest.webmanifest').write_text(data,encoding='utf-8')
-    new = s.replace('href="data:application/json;base64,'+b64+'"','href="manifest.webmanifest"')
-    p.write_text(new,encoding='utf-8')
-    print('Wrote manifest.webmanifest and updated HTML')
\ No newline at end of file
+with open(p,'rb') as f, mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ) as buf:
+    found=next((u for u in find_uris(buf) if u[2]=='application/json' and u[3]
+                and buf[max(0,u[0]-6):u[0]]==b'href="'),None)
+    if not found:
+        print('No base64 manifest found')
+    else:
+        start,end,_,_,payload=found
+        with open('manifest.webmanifest','wb') as out:
+            decode_to(buf,payload,end,True,out)
+        head,tail=buf[:start],buf[end:]
+if found:
+    p.write_bytes(head+b'manifest.webmanifest'+tail)
+    print('Wrote manifest.webmanifest and updated HTML')
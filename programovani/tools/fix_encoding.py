@@ -1,17 +1,25 @@
 # -*- coding: utf-8 -*-
-"""Fix broken UTF-8 encoding in MenuModals.js"""
+"""Fix broken UTF-8 encoding in MenuModals.js
 
-import os
+The table below covers only strings whose damage is lossy (cp1252-undefined
+bytes such as 0x8D/0x8F dropped, curly quotes typed as ASCII), which no
+round-trip can recover; everything else is repaired generically by
+fix_mojibake.repair_text. For the whole tree use tools/fix_mojibake.py.
+"""
+
+import sys
+from pathlib import Path
+
+from fix_mojibake import repair_text
 
 # Map of broken UTF-8 sequences to correct characters
 fixes = {
     'âŒ': '❌',
     'â³': '⏳',
-    'âœ…': '✅',
     'âœ"': '✔',
     'ðŸ"¥': '📥',
     'ðŸ"‹': '📋',
-    'ðŸ—'ï¸': '🗑️',
+    'ðŸ—‘ï¸': '🗑️',
     'âš ï¸': '⚠️',
     'ðŸ"„': '📄',
     'ðŸ"': '🔍',
@@ -22,33 +30,30 @@ fixes = {
     'NaÄti': 'Načti',
     'naÄten': 'načten',
     'NaÄteno': 'Načteno',
-    'NeplatnÃ¡': 'Neplatná',
-    'PrÃ¡zdnÃ½': 'Prázdný',
-    'ÃºspÄ›Å¡nÄ›': 'úspěšně',
-    'znakÅ¯': 'znaků',
-    'Å½Ã¡dnÃ©': 'Žádné',
-    'nezaznamenÃ¡ny': 'nezaznamenány',
-    'poslednÃ­ch': 'posledních',
-    'DuplicitnÃ­': 'Duplicitní',
     'potlaÄeny': 'potlačeny',
-    'pouÅ¾ijte': 'použijte',
-    'KopÃ­rovat': 'Kopírovat',
-    'ZkopÃ­rovÃ¡no': 'Zkopírováno',
-    'vymazÃ¡n': 'vymazán',
-    'NepodaÅ™ilo': 'Nepodařilo',
-    'problÃ©m': 'problém',
-    'textovÃ©ho': 'textového',
 }
 
-file_path = r'c:\Users\stistko\CascadeProjects\test_base\programovani\src\modules\menu\services\MenuModals.js'
+ROOT = Path(__file__).resolve().parents[1]
+FILE_PATH = ROOT / 'src' / 'modules' / 'menu' / 'services' / 'MenuModals.js'
+
+
+def fix_text(content):
+    for old, new in fixes.items():
+        content = content.replace(old, new)
+    return repair_text(content)[0]
+
+
+def main(file_path=FILE_PATH):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    content = fix_text(content)
 
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(content)
 
-for old, new in fixes.items():
-    content = content.replace(old, new)
+    print(f'Fixed encoding in {Path(file_path).name}!')
 
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
 
-print('Fixed encoding in MenuModals.js!')
+if __name__ == '__main__':
+    main(*sys.argv[1:2])
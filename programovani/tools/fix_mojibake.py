@@ -0,0 +1,238 @@
+"""
+Hledání a oprava dvojitě kódovaného UTF-8 (mojibake) v celém stromu.
+
+Text uložený jako UTF-8, jednou přečtený jako cp1252/latin-1 a znovu uložený
+jako UTF-8, má charakteristický tvar: úvodní znak U+00C2-U+00F4 (bajt
+0xC2-0xF4) následovaný 1-3 znaky, které v cp1252/latin-1 odpovídají bajtům
+0x80-0xBF. Takové běhy se najdou jedním regexem, převedou zpět na bajty
+a striktně dekódují jako UTF-8 - bez pevné tabulky náhrad. Co se striktně
+dekódovat nedá, zůstane beze změny.
+
+U emoji (4bajtové sekvence) se často místo „ “ ‘ ’ (0x91-0x94) objeví obyčejná
+uvozovka " nebo '; zkusí se obě varianty a oprava se použije jen, když je
+jednoznačná.
+
+Výsledek musí být věrohodný text (ne kombinující znaky, řídicí znaky ani
+exotická písma z 2bajtového rozsahu; písmena jiného písma než latinky - CJK,
+hangul, arabština... - jen pokud je soubor už obsahuje), jinak se běh
+považuje za legitimní. Bez toho by se např. „é€™“ změnilo na „這“.
+
+- soubory bez podezřelé bajtové sekvence se přeskočí bez dekódování,
+- každý soubor se opravuje jedním průchodem (re.sub), paralelně v process poolu,
+- report: počet oprav a ukázky (řádek, původní -> opravené), volitelně JSON.
+
+    python tools/fix_mojibake.py [-n] [-j N] [--report report.json] [cesty...]
+"""
+import argparse
+import json
+import os
+import re
+import unicodedata
+from functools import partial
+from pathlib import Path
+
+from incremental import run_parallel, default_jobs
+
+ROOT = Path(__file__).resolve().parents[1]
+SUFFIXES = ('.js', '.mjs', '.ts', '.html', '.htm', '.css', '.json', '.md')
+SKIP_DIRS = {'node_modules', 'dist', 'build', '.git', '.cache', 'archive'}
+# Tabulky náhrad obsahují mojibake záměrně
+EXCLUDE = ('tools/fix_encoding.py', 'tools/fix_encoding.js')
+SAMPLES = 5
+
+
+def _byte_map():
+    """znak -> bajt pro 0x80-0xFF podle cp1252, nedefinované pozice podle latin-1"""
+    mapping = {}
+    for b in range(0x80, 0x100):
+        mapping[bytes([b]).decode('latin-1')] = b
+        try:
+            mapping[bytes([b]).decode('cp1252')] = b
+        except UnicodeDecodeError:
+            pass
+    return mapping
+
+
+BYTE_OF = _byte_map()
+_QUOTE_BYTES = {'"': (0x93, 0x94), "'": (0x91, 0x92)}
+
+
+def _char_class(lo, hi):
+    return '[' + ''.join(re.escape(c) for c, b in sorted(BYTE_OF.items()) if lo <= b <= hi) + ']'
+
+
+_CONT = _char_class(0x80, 0xBF)
+_CONT_Q = _CONT[:-1] + '"\']'
+MOJIBAKE_RE = re.compile(
+    '(?:' + '|'.join([
+        _char_class(0xF0, 0xF4) + _CONT + _CONT_Q + _CONT_Q,
+        _char_class(0xE0, 0xEF) + _CONT + _CONT,
+        _char_class(0xC2, 0xDF) + _CONT,
+    ]) + ')+'
+)
+# Úvodní znak (UTF-8 C3 82-C3 B4) následovaný znakem z rozsahu U+0080-U+00BF
+# nebo cp1252 speciálem (Œ Š Ÿ Ž ƒ ˆ ˜ – — ‘ “ • … ‰ € ™) - levné hledání v bajtech
+PREFILTER_RE = re.compile(rb'\xc3[\x82-\xb4](?:\xc2[\x80-\xbf]|\xc5[\x92\x93\xa0\xa1\xb8\xbd\xbe]|\xc6\x92'
+                          rb'|\xcb[\x86\x9c]|\xe2(?:\x80|\x82\xac|\x84\xa2))')
+
+
+def _candidates(run):
+    """Všechny bajtové varianty běhu (ASCII uvozovky mohou být 0x91-0x94)"""
+    variants = [b'']
+    for ch in run:
+        options = _QUOTE_BYTES.get(ch) or (BYTE_OF[ch],)
+        variants = [v + bytes([o]) for v in variants for o in options]
+        if len(variants) > 16:
+            return []
+    return variants
+
+
+def script_of(ch):
+    """Písmo písmene/číslice od U+0800 podle jména znaku (CJK, HANGUL, ARABIC...);
+    None pro latinku, interpunkci a symboly (U+2000-U+2BFF, emoji)"""
+    cp = ord(ch)
+    if cp < 0x800 or 0x2000 <= cp < 0x2C00 or unicodedata.category(ch)[0] not in 'LN':
+        return None
+    script = unicodedata.name(ch, '?').split(' ', 1)[0]
+    return None if script == 'LATIN' else script
+
+
+def text_scripts(text):
+    """Písma (script_of), která se v textu vyskytují"""
+    return {script for script in map(script_of, set(text)) if script is not None}
+
+
+def plausible(text, scripts=frozenset()):
+    """Odmítne výsledky, které v reálném textu nedávají smysl - typicky velká česká
+    písmena (NESMÍŠ = Í + Š) by se jinak 'opravila' na kombinující diakritiku
+    a běžné dvojice jako é€™ na CJK znak; `scripts` = písma, která soubor už obsahuje"""
+    for ch in text:
+        cp = ord(ch)
+        script = script_of(ch)
+        if script is not None and script not in scripts:
+            return False
+        # 2bajtové znaky: jen latinka (C2-C5), řečtina a základní cyrilice (CE-D1)
+        if 0x80 <= cp < 0x800 and not (cp < 0x180 or 0x380 <= cp < 0x480):
+            return False
+        category = unicodedata.category(ch)
+        if category[0] == 'M' and not (0xFE00 <= cp <= 0xFE0F or cp == 0x20E3):
+            return False
+        if category in ('Cc', 'Cn', 'Co', 'Cs') or (category == 'Cf' and cp != 0x200D):
+            return False
+    return True
+
+
+def decodings(run, scripts=frozenset()):
+    """Věrohodné opravy běhu (více než jedna = nejednoznačné)"""
+    found = set()
+    for raw in _candidates(run):
+        try:
+            text = raw.decode('utf-8')
+        except UnicodeDecodeError:
+            continue
+        # Dvakrát poškozený text (cp1252 -> UTF-8 -> cp1252) se opraví i v další vrstvě
+        deeper = repair_run(text, scripts) if MOJIBAKE_RE.fullmatch(text) else None
+        if deeper is not None:
+            found.add(deeper)
+        elif plausible(text, scripts):
+            found.add(text)
+    return found
+
+
+def repair_run(run, scripts=frozenset()):
+    """Opravený text běhu, nebo None (nedekódovatelný, nevěrohodný či nejednoznačný)"""
+    found = decodings(run, scripts)
+    return found.pop() if len(found) == 1 else None
+
+
+def repair_text(text, samples=None):
+    """Opraví všechny běhy jedním průchodem; vrací (text, počet oprav, nejednoznačné běhy)"""
+    count = 0
+    ambiguous = 0
+    scripts = text_scripts(text)
+
+    def fix(m):
+        nonlocal count, ambiguous
+        found = decodings(m.group(), scripts)
+        if len(found) != 1:
+            ambiguous += len(found) > 1
+            return m.group()
+        fixed = found.pop()
+        count += 1
+        if samples is not None and len(samples) < SAMPLES:
+            samples.append((m.start(), m.group(), fixed))
+        return fixed
+
+    return MOJIBAKE_RE.sub(fix, text), count, ambiguous
+
+
+def scan_file(path, root=ROOT, dry_run=False):
+    data = path.read_bytes()
+    result = {'path': path.relative_to(root).as_posix() if path.is_relative_to(root) else str(path),
+              'repairs': 0, 'ambiguous': 0, 'samples': []}
+    if not PREFILTER_RE.search(data):
+        return result
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        result['error'] = 'not valid UTF-8'
+        return result
+    samples = []
+    new_text, result['repairs'], result['ambiguous'] = repair_text(text, samples)
+    result['samples'] = [
+        {'line': text.count('\n', 0, pos) + 1, 'before': before, 'after': after}
+        for pos, before, after in samples
+    ]
+    if result['repairs'] and not dry_run:
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_bytes(new_text.encode('utf-8'))
+        os.replace(tmp, path)
+    return result
+
+
+def source_files(paths, root=ROOT, suffixes=SUFFIXES, exclude=EXCLUDE):
+    excluded = {(root / e).resolve() for e in exclude}
+    for base in paths:
+        base = Path(base).resolve()
+        if base.is_file():
+            yield base
+            continue
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for name in filenames:
+                path = Path(dirpath) / name
+                if name.endswith(suffixes) and path not in excluded:
+                    yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detect and repair double-encoded UTF-8 (mojibake) across the tree')
+    parser.add_argument('paths', nargs='*', default=[ROOT], help='files or directories (default: project root)')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='report only, write nothing')
+    parser.add_argument('-j', '--jobs', type=int, default=default_jobs())
+    parser.add_argument('--ext', nargs='+', default=list(SUFFIXES), help='file suffixes to scan')
+    parser.add_argument('--report', type=Path, help='write the full report as JSON')
+    args = parser.parse_args()
+
+    files = sorted(source_files(args.paths, suffixes=tuple(args.ext)))
+    results = run_parallel(partial(scan_file, dry_run=args.dry_run), files, args.jobs)
+    damaged = [r for r in results if r['repairs'] or r['ambiguous'] or r.get('error')]
+
+    for r in damaged:
+        if r.get('error'):
+            print(f"{r['path']}: skipped, {r['error']}")
+            continue
+        print(f"{r['path']}: {r['repairs']} {'repairable' if args.dry_run else 'repaired'}"
+              + (f", {r['ambiguous']} ambiguous (left as is)" if r['ambiguous'] else ''))
+        for s in r['samples']:
+            print(f"    line {s['line']}: {s['before']!r} -> {s['after']!r}")
+    total = sum(r['repairs'] for r in results)
+    print(f"{len(files)} files scanned, {len(damaged)} with mojibake, {total} runs "
+          f"{'repairable (dry run)' if args.dry_run else 'repaired'}.")
+    if args.report:
+        args.report.write_text(json.dumps({'dry_run': args.dry_run, 'files': damaged}, indent=1,
+                                          ensure_ascii=False) + '\n', encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+Jednoprůchodový tokenizer a přepisovač HTML atributů pro nástroje
+na převod inline stylů (convert_inline_styles, move_inline_to_css,
+replace_inline_styles_regex).
+
+Dokument se projde jednou zleva doprava, každý otevírací tag se rozparsuje
+právě jednou a výstup se skládá po částech (seznam + join, nebo přímý zápis
+do souboru) - cena je lineární vůči velikosti souboru bez ohledu na počet
+stylů. Nezměněné tagy se vypíšou přesně tak, jak byly (včetně mezer a uvozovek).
+
+Obsah <script>/<style> se prochází také - inline styly v HTML řetězcích
+uvnitř JS se tak přepisují stejně jako dřív regexy. Co nejde čistě
+rozparsovat jako tag (např. `a < b` v JS), zůstane beze změny jako text.
+"""
+import os
+import re
+from pathlib import Path
+
+_TAG_NAME_RE = re.compile(r'[A-Za-z][\w:.-]*')
+_ATTR_RE = re.compile(
+    r'''(\s+)([^\s"'<>/=]+)(?:(\s*=\s*)(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?'''
+)
+_TAG_END_RE = re.compile(r'\s*(/?)>')
+
+
+class Attr:
+    __slots__ = ('name', 'value', 'quote', 'lead', 'eq')
+
+    def __init__(self, name, value, quote='"', lead=' ', eq='='):
+        self.name = name
+        self.value = value      # None = atribut bez hodnoty (např. `hidden`)
+        self.quote = quote
+        self.lead = lead
+        self.eq = eq
+
+    def __str__(self):
+        if self.value is None:
+            return f'{self.lead}{self.name}'
+        quote = self.quote
+        value = self.value
+        if quote == '' and (not value or re.search(r'[\s"\'=<>`]', value)):
+            quote = '"'
+        if quote and quote in value:
+            other = "'" if quote == '"' else '"'
+            if other not in value:
+                quote = other
+            else:
+                value = value.replace(quote, '&quot;' if quote == '"' else '&#39;')
+        return f'{self.lead}{self.name}{self.eq}{quote}{value}{quote}'
+
+
+class Tag:
+    """Otevírací tag; při změně atributů se serializuje znovu, jinak vrací původní text"""
+    __slots__ = ('name', 'attrs', 'self_closing', 'raw', 'tail', 'dirty')
+
+    def __init__(self, name, attrs, self_closing, raw, tail):
+        self.name = name
+        self.attrs = attrs
+        self.self_closing = self_closing
+        self.raw = raw
+        self.tail = tail        # text mezi posledním atributem a '>' (mezery, '/')
+        self.dirty = False
+
+    def _find(self, name):
+        name = name.lower()
+        return [a for a in self.attrs if a.name.lower() == name]
+
+    def get(self, name, default=None):
+        found = self._find(name)
+        return found[0].value if found else default
+
+    def has(self, name):
+        return bool(self._find(name))
+
+    def set(self, name, value):
+        found = self._find(name)
+        if found:
+            found[0].value = value
+            for extra in found[1:]:
+                self.attrs.remove(extra)
+        else:
+            self.attrs.append(Attr(name, value))
+        self.dirty = True
+
+    def remove(self, name):
+        found = self._find(name)
+        for attr in found:
+            self.attrs.remove(attr)
+        self.dirty = self.dirty or bool(found)
+        return bool(found)
+
+    def classes(self):
+        return [c for a in self._find('class') for c in (a.value or '').split()]
+
+    def add_class(self, *names):
+        """Přidá třídy do atributu class; duplicitní class atributy sloučí do prvního"""
+        current = self.classes()
+        merged = current + [n for n in dict.fromkeys(' '.join(names).split()) if n not in current]
+        if merged == current and len(self._find('class')) == 1:
+            return
+        self.set('class', ' '.join(merged))
+
+    def style_to_class(self, *names):
+        """Nahradí style atributy třídami; chybějící class se vloží na místo prvního style"""
+        styles = self._find('style')
+        if styles and names and not self._find('class'):
+            self.attrs.insert(self.attrs.index(styles[0]), Attr('class', '', '"', styles[0].lead))
+        self.remove('style')
+        self.add_class(*names)
+
+    def pop_style(self):
+        """Odebere všechny style atributy a vrátí jejich obsah spojený středníkem"""
+        values = [a.value for a in self._find('style') if a.value is not None]
+        if not self.remove('style'):
+            return None
+        return '; '.join(v.strip().rstrip(';') for v in values if v.strip())
+
+    def __str__(self):
+        if not self.dirty:
+            return self.raw
+        tail = self.tail
+        if self.self_closing and '/' not in tail:
+            tail = ' /'
+        return f"<{self.name}{''.join(str(a) for a in self.attrs)}{tail}>"
+
+
+def _parse_tag(text, pos):
+    """Rozparsuje otevírací tag začínající na text[pos] == '<'; vrací (Tag, konec) nebo None"""
+    m = _TAG_NAME_RE.match(text, pos + 1)
+    if not m:
+        return None
+    name = m.group()
+    cur = m.end()
+    attrs = []
+    while True:
+        am = _ATTR_RE.match(text, cur)
+        if not am:
+            break
+        lead, attr_name, eq, dq, sq, uq = am.groups()
+        if eq is None:
+            attrs.append(Attr(attr_name, None, '', lead, ''))
+        elif dq is not None:
+            attrs.append(Attr(attr_name, dq, '"', lead, eq))
+        elif sq is not None:
+            attrs.append(Attr(attr_name, sq, "'", lead, eq))
+        else:
+            attrs.append(Attr(attr_name, uq, '', lead, eq))
+        cur = am.end()
+    em = _TAG_END_RE.match(text, cur)
+    if not em:
+        return None
+    end = em.end()
+    return Tag(name, attrs, bool(em.group(1)), text[pos:end], em.group(0)[:-1]), end
+
+
+def scan_tags(text):
+    """Generuje (pozice, Tag) pro každý otevírací tag; komentáře se přeskočí"""
+    pos = 0
+    n = len(text)
+    find = text.find
+    while pos < n:
+        lt = find('<', pos)
+        if lt == -1:
+            return
+        if text.startswith('<!--', lt):
+            close = find('-->', lt + 4)
+            pos = n if close == -1 else close + 3
+            continue
+        parsed = _parse_tag(text, lt)
+        if parsed is None:
+            # Uzavírací tag, doctype, porovnání v JS... - ponech jako text
+            pos = lt + 1
+            continue
+        tag, pos = parsed
+        yield lt, tag
+
+
+def iter_tokens(text):
+    """Generuje ('text', str) a ('tag', Tag) v pořadí dokumentu"""
+    pos = 0
+    for start, tag in scan_tags(text):
+        if start > pos:
+            yield 'text', text[pos:start]
+        yield 'tag', tag
+        pos = start + len(tag.raw)
+    if pos < len(text):
+        yield 'text', text[pos:]
+
+
+def rewrite(text, transform, write=None):
+    """Jedním průchodem zavolá transform(tag) na každý otevírací tag.
+
+    transform tag upravuje na místě (set/remove/add_class/style_to_class).
+    Výstup se posílá po částech do `write`; bez něj se vrátí jako řetězec.
+    Vrací (výstup nebo None, počet změněných tagů).
+    """
+    chunks = None
+    if write is None:
+        chunks = []
+        write = chunks.append
+    changed = 0
+    pending = 0             # nezměněný text se vypisuje po souvislých úsecích
+    for start, tag in scan_tags(text):
+        transform(tag)
+        if tag.dirty:
+            changed += 1
+            if start > pending:
+                write(text[pending:start])
+            write(str(tag))
+            pending = start + len(tag.raw)
+    if pending < len(text):
+        write(text[pending:])
+    return (''.join(chunks) if chunks is not None else None), changed
+
+
+def rewrite_file(path, transform, encoding='utf-8', backup_suffix=None):
+    """Přepíše soubor; výstup se zapisuje průběžně do dočasného souboru, který
+    nahradí originál jen pokud se něco změnilo. Vrací počet změněných tagů."""
+    path = Path(path)
+    with open(path, encoding=encoding, newline='') as f:
+        text = f.read()
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding=encoding, newline='') as out:
+        _, changed = rewrite(text, transform, out.write)
+    if not changed:
+        tmp.unlink()
+        return 0
+    if backup_suffix:
+        backup = path.with_name(path.name + backup_suffix)
+        if not backup.exists():
+            with open(backup, 'w', encoding=encoding, newline='') as f:
+                f.write(text)
+    os.replace(tmp, path)
+    return changed
+
+
+def normalize_declarations(style):
+    """Rozdělí obsah style atributu na neprázdné deklarace (bez okrajových mezer)"""
+    return [p.strip() for p in style.replace('\n', ' ').split(';') if p.strip()]
@@ -0,0 +1,96 @@
+"""
+Společná infrastruktura pro nástroje, které zpracovávají mnoho souborů
+(move_inline_to_css, replace_inline_styles_regex):
+
+- FileManifest: perzistentní manifest obsahových hashů. Soubor, který se od
+  posledního běhu nezměnil (stejná velikost + mtime, případně stejný hash),
+  se přeskočí bez čtení. Změna samotného nástroje manifest zneplatní.
+- run_parallel: zpracování souborů v process poolu; výsledky vrací ve stejném
+  pořadí jako vstup, takže slučování (např. tabulek tříd) je deterministické.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).resolve().parent / '.cache'
+
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def default_jobs():
+    return os.cpu_count() or 1
+
+
+class FileManifest:
+    def __init__(self, name, config_files=(), root=None):
+        self.path = CACHE_DIR / f'{name}.json'
+        self.root = Path(root) if root else None
+        # Hash zdrojáků nástroje (pravidla, normalizace...) - jiná verze = vše znovu
+        self.config = content_hash(b''.join(Path(f).read_bytes() for f in config_files))
+        self.entries = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding='utf-8'))
+            except (ValueError, OSError):
+                data = {}
+            if data.get('config') == self.config:
+                self.entries = data.get('files', {})
+
+    def _key(self, path):
+        path = Path(path)
+        if self.root:
+            try:
+                return path.resolve().relative_to(self.root.resolve()).as_posix()
+            except ValueError:
+                pass
+        return path.resolve().as_posix()
+
+    def is_current(self, path):
+        """True, pokud soubor od posledního záznamu nezměnil obsah"""
+        entry = self.entries.get(self._key(path))
+        if entry is None:
+            return False
+        st = Path(path).stat()
+        if entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return True
+        if entry['size'] != st.st_size:
+            return False
+        # Stejná velikost, jiný mtime (touch, checkout) - rozhodne obsah
+        if content_hash(Path(path).read_bytes()) == entry['sha1']:
+            entry['mtime_ns'] = st.st_mtime_ns
+            return True
+        return False
+
+    def cached(self, path, field):
+        """Uložená hodnota `field` (výsledek minulého běhu), pokud se soubor nezměnil; jinak None"""
+        entry = self.entries.get(self._key(path))
+        if entry is None or field not in entry or not self.is_current(path):
+            return None
+        return entry[field]
+
+    def record(self, path, sha1=None, **extra):
+        """Zaznamená aktuální stav souboru; `extra` se uloží k záznamu (viz cached)"""
+        st = Path(path).stat()
+        if sha1 is None:
+            sha1 = content_hash(Path(path).read_bytes())
+        self.entries[self._key(path)] = {'sha1': sha1, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, **extra}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'config': self.config, 'files': self.entries},
+                                  indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+def run_parallel(func, items, jobs):
+    """Zavolá func na každou položku; při jobs > 1 v process poolu. Pořadí výsledků = pořadí vstupu."""
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(items))) as executor:
+        return list(executor.map(func, items, chunksize=max(1, len(items) // (jobs * 4))))
@@ -1,91 +1,105 @@
-import re
+import argparse
+from functools import partial
 from pathlib import Path
-import hashlib
+
+from class_registry import ClassRegistry, normalize, class_name
+from html_rewriter import rewrite
+from incremental import FileManifest, run_parallel, content_hash, default_jobs
 
 ROOT = Path(__file__).resolve().parents[1]
 CSS_FILE = ROOT / 'css' / 'styles.css'
 
-style_re = re.compile(r'style="([^"]+)"')
-
-# load existing styles.css
-css_text = CSS_FILE.read_text(encoding='utf-8')
-existing_classes = {}
-# Build reverse map of existing inl- classes if any (by scanning for previously generated comments)
-for m in re.finditer(r'\.inl-([0-9a-f]{6})\s*{([^}]*)}', css_text):
-    cls = 'inl-' + m.group(1)
-    decl = m.group(2).strip()
-    existing_classes[decl] = cls
-
-new_classes = {}  # decl -> class
-file_changes = 0
-
-html_files = list(ROOT.glob('**/*.html'))
-for path in html_files:
-    text = path.read_text(encoding='utf-8')
-    matches = list(style_re.finditer(text))
-    if not matches:
-        continue
-    new_text = text
-    offset = 0
-    for m in matches:
-        decl = m.group(1).strip()
-        if decl == '':
+
+def move_styles(text, existing_classes):
+    """Replace style="..." with generated classes; returns (new_text, changed_tags, new_classes)
+
+    existing_classes maps canonical declarations to registered class names
+    (ClassRegistry.snapshot()); equivalent styles share one class.
+    """
+    new_classes = {}  # canonical decl -> class
+
+    def move_style(tag):
+        decl = tag.get('style')
+        if decl is None:
+            return
+        norm_decl = normalize(decl)
+        if norm_decl is None:
             # remove empty style
-            start, end = m.span()
-            new_text = new_text[:start+offset] + new_text[end+offset:]
-            offset -= (end - start)
-            continue
-        # Normalize declaration: ensure trailing semicolons and normalized spacing
-        parts = [p.strip() for p in decl.split(';') if p.strip()]
-        norm_decl = '; '.join(parts) + (';' if parts else '')
+            tag.remove('style')
+            return
         # check existing classes
-        cls = existing_classes.get(norm_decl)
-        if not cls:
-            cls = new_classes.get(norm_decl)
+        cls = existing_classes.get(norm_decl) or new_classes.get(norm_decl)
         if not cls:
-            # generate short hash-based class name
-            h = hashlib.md5(norm_decl.encode('utf-8')).hexdigest()[:6]
-            cls = f'inl-{h}'
-            new_classes[norm_decl] = cls
+            # hash-based class name (deterministic, so parallel workers agree)
+            cls = new_classes[norm_decl] = class_name(norm_decl)
         # Replace style="..." with class insertion, preserving existing class attr if present
-        span_start, span_end = m.span()
-        # find preceding segment up to tag start
-        prefix = new_text[:span_start+offset]
-        suffix = new_text[span_end+offset:]
-        # check if there is a class attribute before the style inside the same tag
-        tag_start = prefix.rfind('<')
-        tag_end = span_end+offset
-        tag_text = new_text[tag_start:tag_end]
-        class_match = re.search(r'class="([^"]*)"', tag_text)
-        if class_match:
-            # insert in existing class list
-            old_classes = class_match.group(1)
-            # ensure we don't duplicate
-            if cls not in old_classes.split():
-                new_tag_text = tag_text.replace(f'class="{old_classes}"', f'class="{old_classes} {cls}"')
-            else:
-                new_tag_text = tag_text
-            # remove the style attribute from new_tag_text
-            new_tag_text = re.sub(r'\sstyle="[^"]+"', '', new_tag_text)
-            # replace in new_text
-            new_text = new_text[:tag_start] + new_tag_text + suffix
-            # update offset: len(new_tag_text) - len(tag_text)
-            offset += len(new_tag_text) - len(tag_text)
-        else:
-            # No class attribute, add one
-            # Replace the style attribute with class="<cls>"
-            new_tag_text = tag_text.replace(m.group(0), f' class="{cls}"')
-            new_text = new_text[:tag_start] + new_tag_text + suffix
-            offset += len(new_tag_text) - len(tag_text)
-    if new_text != text:
-        path.write_text(new_text, encoding='utf-8')
-        file_changes += 1
-
-# Append new classes to styles.css
-if new_classes:
-    css_add = '\n/* Generated classes moved from inline styles */\n'
+        tag.style_to_class(cls)
+
+    new_text, changed = rewrite(text, move_style)
+    return new_text, changed, new_classes
+
+
+def process_file(path, existing_classes, dry_run=False):
+    data = path.read_bytes()
+    new_text, changed, new_classes = move_styles(data.decode('utf-8'), existing_classes)
+    if changed:
+        data = new_text.encode('utf-8')
+        if not dry_run:
+            path.write_bytes(data)
+    return {'path': path, 'changed': changed, 'classes': new_classes, 'sha1': content_hash(data)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move inline style="..." attributes into generated CSS classes')
+    parser.add_argument('-j', '--jobs', type=int, default=default_jobs(), help='parallel worker processes')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='report what would change, write nothing')
+    parser.add_argument('--force', action='store_true', help='ignore the manifest and process every file')
+    args = parser.parse_args()
+
+    # Registry of generated classes (+ any loose inl-* rules already in styles.css)
+    registry = ClassRegistry()
+    if CSS_FILE.exists():
+        registry.import_css(CSS_FILE.read_text(encoding='utf-8'))
+    existing_classes = registry.snapshot()
+
+    tools_dir = Path(__file__).parent
+    manifest = FileManifest('move_inline_to_css', [__file__, tools_dir / 'html_rewriter.py',
+                                                   tools_dir / 'class_registry.py'], ROOT)
+    html_files = sorted(ROOT.glob('**/*.html'))
+    todo = [p for p in html_files if args.force or not manifest.is_current(p)]
+
+    results = run_parallel(partial(process_file, existing_classes=existing_classes, dry_run=args.dry_run),
+                           todo, args.jobs)
+
+    # Merge class tables in file order -> same CSS output regardless of --jobs
+    new_classes = {}
+    for result in results:
+        for decl, cls in result['classes'].items():
+            new_classes.setdefault(decl, cls)
+    changed_files = [r for r in results if r['changed']]
+
+    if args.dry_run:
+        for r in changed_files:
+            print(f"would modify {r['path'].relative_to(ROOT)}: {r['changed']} tags")
+        for decl, cls in new_classes.items():
+            print(f"would add .{cls} {{ {decl} }}")
+        print(f"Dry run: {len(html_files)} HTML files, {len(html_files) - len(todo)} unchanged since last run, "
+              f"{len(changed_files)} would be modified, {len(new_classes)} classes would be added.")
+        return
+
+    # Rewrite the managed block in styles.css (no blind appends, no duplicates)
     for decl, cls in new_classes.items():
-        css_add += f'.{cls} {{ {decl} }}\n'
-    CSS_FILE.write_text(css_text + css_add, encoding='utf-8')
+        registry.register(decl, cls)
+    registry.write_css(CSS_FILE)
+    registry.save()
+
+    for r in results:
+        manifest.record(r['path'], r['sha1'])
+    manifest.save()
+
+    print(f"Processed {len(html_files)} HTML files ({len(html_files) - len(todo)} unchanged, skipped), "
+          f"modified {len(changed_files)} files, added {len(new_classes)} classes.")
+
 
-print(f"Processed {len(html_files)} HTML files, modified {file_changes} files, added {len(new_classes)} classes.")
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,44 @@
+"""
+Přesune obsah před <!DOCTYPE html> (slepený dokument) na začátek <body>.
+Funkce používá i watch_tools.py (transformace preamble).
+"""
 from pathlib import Path
-p=Path('html_studio.html')
-s=p.read_text(encoding='utf-8')
-idx = s.find('<!DOCTYPE html>')
-if idx==-1:
-    print('No DOCTYPE found')
-else:
-    pre = s[:idx]
-    rest = s[idx:]
+
+DOCTYPE = '<!DOCTYPE html>'
+
+
+def preamble_needed(data):
+    """Je před DOCTYPE nějaký obsah? (bajty - levná kontrola bez dekódování)"""
+    idx = data.find(DOCTYPE.encode('ascii'))
+    return idx > 0 and data[:idx].strip() != b''
+
+
+def move_preamble(text):
+    """Text s obsahem před DOCTYPE vloženým za <body ...>; None, když není DOCTYPE nebo <body>"""
+    idx = text.find(DOCTYPE)
+    if idx == -1:
+        return None
+    pre, rest = text[:idx], text[idx:]
     bidx = rest.find('<body')
-    if bidx==-1:
+    if bidx == -1:
+        return None
+    insert_pos = rest.find('>', bidx) + 1
+    return rest[:insert_pos] + '\n' + pre + rest[insert_pos:]
+
+
+def main():
+    p = Path('html_studio.html')
+    s = p.read_text(encoding='utf-8')
+    if DOCTYPE not in s:
+        print('No DOCTYPE found')
+        return
+    new = move_preamble(s)
+    if new is None:
         print('No <body> found after DOCTYPE')
     else:
-        # find the end of the body start tag
-        body_tag_end = rest.find('>', bidx)
-        insert_pos = body_tag_end+1
-        new = rest[:insert_pos] + '\n' + pre + rest[insert_pos:]
-        Path('html_studio.html').write_text(new,encoding='utf-8')
+        p.write_text(new, encoding='utf-8')
         print('Moved pre-DOCTYPE content into <body>')
+
+
+if __name__ == '__main__':
+    main()
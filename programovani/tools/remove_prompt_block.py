@@ -2,42 +2,31 @@
 # -*- coding: utf-8 -*-
 """
 Smazání duplicitního prompt bloku v AIPanel.js
-"""
 
-def remove_duplicate_prompt_block():
-    file_path = r"c:\Users\stistko\CascadeProjects\test_base\programovani\src\modules\ai\AIPanel.js"
+    python tools/remove_prompt_block.py [cesta/k/AIPanel.js] [--dry-run]
+"""
+from aipanel_codemods import AIPANEL_PATH, locate, remove_prompt_block
+from edit_transaction import run_codemod
 
-    # Přečti soubor s UTF-8
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+report = {}
 
-    # Najdi začátek bloku který chceme smazat (řádek s "// Add attached files first")
-    start_delete = None
-    end_delete = None
 
-    for i, line in enumerate(lines):
-        # Hledáme řádek po "activeFileId ="
-        if "activeFileId = state.get('files.active');" in line:
-            start_delete = i + 1  # Řádek po tomto
+def build(tx):
+    # Blok mezi řádkem "activeFileId = ..." a "// Get provider and model from UI"
+    report['removed'] = remove_prompt_block(tx, locate(tx))
+    report['lines'] = tx.apply().count('\n')
 
-        # Hledáme konec - řádek před "// Get provider and model from UI"
-        if start_delete and "// Get provider and model from UI" in line:
-            end_delete = i
-            break
 
-    if start_delete and end_delete:
-        # Smaž řádky mezi start_delete a end_delete
-        del lines[start_delete:end_delete]
-        print(f"✅ Smazáno {end_delete - start_delete} řádků (prompt blok)")
-    else:
+def remove_duplicate_prompt_block():
+    run_codemod(build, AIPANEL_PATH, 'Remove the duplicated prompt block from AIPanel.js')
+    if report['removed'] is None:
         print("❌ Nenašel jsem blok ke smazání")
         return
-
-    # Zapiš zpět s UTF-8
-    with open(file_path, 'w', encoding='utf-8', newline='\n') as f:
-        f.writelines(lines)
-
-    print(f"📝 Nový počet řádků: {len(lines)}")
+    if not report['removed']:
+        print("✅ Duplicitní prompt blok už je smazaný, beze změny")
+        return
+    print(f"✅ Smazáno {report['removed']} řádků (prompt blok)")
+    print(f"📝 Nový počet řádků: {report['lines']}")
 
 if __name__ == "__main__":
     remove_duplicate_prompt_block()
@@ -0,0 +1,76 @@
+"""
+Kompilovaná tabulka pravidel inline style -> třída pro replace_inline_styles_regex.
+
+Pravidla se načítají z JSON tabulky (inline_style_rules.json) a zkompilují se
+do jednoho matcheru:
+- "style" pravidla (přesná hodnota atributu) -> jeden slovník, O(1) na tag,
+- "pattern" pravidla -> jeden alternační regex s pojmenovanou skupinou pro
+  každé pravidlo; první plně odpovídající alternativa (pořadí v tabulce) vyhrává
+  a šablona class/set_style se rozvine jen pro ni.
+Cena na tag tak nezávisí na počtu pravidel - jedno vyhledání místo ~35 průchodů
+re.sub/str.replace přes celý soubor.
+"""
+import json
+import re
+from pathlib import Path
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent / 'inline_style_rules.json'
+_ACTIONS = ('class', 'set_style')
+
+
+class StyleRules:
+    def __init__(self, rules):
+        self.exact = {}
+        self.patterns = []          # (compiled, action, template)
+        alternatives = []
+        for i, rule in enumerate(rules):
+            action = next((a for a in _ACTIONS if a in rule), None)
+            if action is None:
+                raise ValueError(f'Rule #{i} needs one of {_ACTIONS}: {rule}')
+            if 'style' in rule:
+                # První výskyt stejné hodnoty vyhrává (jako pořadí dřívějších průchodů)
+                self.exact.setdefault(rule['style'], (action, rule[action]))
+            elif 'pattern' in rule:
+                compiled = re.compile(rule['pattern'])
+                # Ve spojeném regexu by se posunula čísla skupin
+                if compiled.groupindex or re.search(r'\\[1-9]|\(\?P=', rule['pattern']):
+                    raise ValueError(f'Rule #{i}: named groups and backreferences are not supported in patterns')
+                alternatives.append(f"(?P<r{len(self.patterns)}>{rule['pattern']})")
+                self.patterns.append((compiled, action, rule[action]))
+            else:
+                raise ValueError(f'Rule #{i} needs "style" or "pattern": {rule}')
+        self.combined = re.compile('|'.join(alternatives)) if alternatives else None
+
+    def __len__(self):
+        return len(self.exact) + len(self.patterns)
+
+    def match(self, style):
+        """Vrátí (action, value) pro hodnotu style atributu, nebo None"""
+        hit = self.exact.get(style)
+        if hit is not None or self.combined is None:
+            return hit
+        m = self.combined.fullmatch(style)
+        if m is None:
+            return None
+        compiled, action, template = self.patterns[int(m.lastgroup[1:])]
+        return action, compiled.fullmatch(style).expand(template)
+
+    def apply(self, tag):
+        """Transformace pro html_rewriter.rewrite"""
+        style = tag.get('style')
+        if style is None:
+            return
+        hit = self.match(style)
+        if hit is None:
+            return
+        action, value = hit
+        if action == 'class':
+            # class se sloučí s existujícím atributem class (např. d-none)
+            tag.style_to_class(*value.split())
+        else:
+            tag.set('style', value)
+
+
+def load_rules(path=DEFAULT_RULES_PATH):
+    data = json.loads(Path(path).read_text(encoding='utf-8'))
+    return StyleRules(data['rules'] if isinstance(data, dict) else data)
@@ -0,0 +1,399 @@
+"""
+Watch mode pro nástroje nad html_studio.html a css/styles.css.
+
+Místo spouštění jednotlivých skriptů (add_line_clamp, move_preamble,
+extract_manifest, převod inline stylů), z nichž každý soubor znovu načte
+a rozparsuje, běží jeden proces, který:
+
+- drží obsah sledovaných souborů v paměti a každých --interval ms kontroluje
+  jen os.stat (velikost + mtime); změněný soubor načte až ve chvíli, kdy je
+  stat stejný ve dvou pollech po sobě (editor ho už dopsal),
+- po uložení najde změněný úsek (společný prefix/sufix se starou verzí,
+  porovnávaný po 64 KiB blocích) a rozšíří ho na celé tagy / CSS pravidla,
+- na tento úsek pustí registrované transformace: tagové transformace jedním
+  společným průchodem html_rewriteru, textové nahrazení jen nad úsekem,
+  celodokumentové (move_preamble) jen když se jich změna týká,
+- výsledek zapíše zpět (vlastní zápis si zapamatuje, takže nevyvolá další
+  událost; pokud se soubor mezitím znovu změnil, zápis vynechá) a vypíše
+  latenci jednotlivých transformací a celé smyčky.
+
+    python tools/watch_tools.py [soubory...] [--transforms line_clamp preamble manifest style_rules]
+    python tools/watch_tools.py --once        # jeden průchod přes celé soubory a konec
+
+Transformace: line_clamp, preamble, manifest, style_rules, inline_to_class
+(inline_to_class převede každý zbylý style="" na třídu z class_registry
+a přepíše spravovaný blok v css/styles.css - proto není ve výchozí sadě).
+"""
+import argparse
+import base64
+import os
+import time
+from pathlib import Path
+
+from add_line_clamp import add_line_clamp
+from html_rewriter import rewrite
+from move_preamble import move_preamble, preamble_needed
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_FILES = (ROOT / 'html_studio.html', ROOT / 'css' / 'styles.css')
+DEFAULT_TRANSFORMS = ('line_clamp', 'preamble', 'manifest', 'style_rules')
+BLOCK = 1 << 16
+
+
+# --- změněný úsek -----------------------------------------------------------
+
+def common_prefix(a, b):
+    """Délka společného začátku; po 64 KiB blocích, v posledním bisekcí (porovnání běží v C)"""
+    n = min(len(a), len(b))
+    lo = 0
+    while lo < n:
+        hi = min(lo + BLOCK, n)
+        if a[lo:hi] != b[lo:hi]:
+            break
+        lo = hi
+    else:
+        return n
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def common_suffix(a, b, limit):
+    """Délka společného konce, nejvýš `limit` (aby se nepřekryl s prefixem)"""
+    la, lb = len(a), len(b)
+    n = min(la, lb, limit)
+    lo = 0
+    while lo < n:
+        hi = min(lo + BLOCK, n)
+        if a[la - hi:la - lo] != b[lb - hi:lb - lo]:
+            break
+        lo = hi
+    else:
+        return n
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if a[la - mid:la - lo] == b[lb - mid:lb - lo]:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def changed_span(old, new):
+    """Rozsah [start, end) v `new`, kterým se liší od `old` (None = beze změny)"""
+    if old == new:
+        return None
+    start = common_prefix(old, new)
+    suffix = common_suffix(old, new, min(len(old), len(new)) - start)
+    return start, len(new) - suffix
+
+
+# Hranice úseků padají na ASCII znaky, takže úsek je vždy platné UTF-8
+
+def expand_html(data, start, end):
+    """Rozšíří úsek na celé řádky obsahující celé tagy"""
+    lt = data.rfind(b'<', 0, start)
+    start = data.rfind(b'\n', 0, lt if lt != -1 else start) + 1
+    gt = data.find(b'>', end)
+    nl = data.find(b'\n', gt if gt != -1 else end)
+    return start, len(data) if nl == -1 else nl + 1
+
+
+def expand_css(data, start, end):
+    """Rozšíří úsek na celá CSS pravidla (od předchozí do následující '}')"""
+    prev = data.rfind(b'}', 0, start)
+    nxt = data.find(b'}', end)
+    return prev + 1, len(data) if nxt == -1 else nxt + 1
+
+
+# --- transformace -----------------------------------------------------------
+
+class Transform:
+    """scope: 'tag' (func(tag, ctx) na každý tag úseku), 'text' (func(úsek, ctx) -> text)
+    nebo 'document' (func(celý text, ctx) -> text nebo None; needs(bajty souboru) rozhodne, zda běžet)"""
+
+    def __init__(self, name, scope, func, kinds=('html',), needs=None):
+        self.name = name
+        self.scope = scope
+        self.func = func
+        self.kinds = kinds
+        self.needs = needs
+        self.calls = 0
+        self.seconds = 0.0
+        self.samples = []
+
+    def record(self, seconds):
+        self.calls += 1
+        self.seconds += seconds
+        self.samples.append(seconds)
+        if len(self.samples) > 1000:
+            del self.samples[:500]
+
+
+def line_clamp(text, ctx):
+    return add_line_clamp(text)
+
+
+def preamble(text, ctx):
+    return move_preamble(text)
+
+
+def extract_manifest(tag, ctx):
+    href = tag.get('href')
+    if tag.name.lower() != 'link' or not href or not href.startswith('data:application/json;base64,'):
+        return
+    target = ctx.path.with_name('manifest.webmanifest')
+    ctx.write_side_file(target, base64.b64decode(href.split(',', 1)[1]))
+    tag.set('href', 'manifest.webmanifest')
+
+
+def style_rules_transform(rules_path=None):
+    from style_rules import DEFAULT_RULES_PATH, load_rules
+    rules = load_rules(rules_path or DEFAULT_RULES_PATH)
+    return lambda tag, ctx: rules.apply(tag)
+
+
+def inline_to_class_transform(css_path):
+    from class_registry import ClassRegistry
+    registry = ClassRegistry(css_path.with_name('class-registry.json'))
+    if css_path.exists():
+        registry.import_css(css_path.read_text(encoding='utf-8'))
+
+    def flush(ctx):
+        css_text = css_path.read_text(encoding='utf-8') if css_path.exists() else ''
+        ctx.write_side_file(css_path, registry.render_css(css_text).encode('utf-8'))
+        registry.save()
+
+    def convert(tag, ctx):
+        style = tag.get('style')
+        if style is None:
+            return
+        known = len(registry.classes)
+        cls = registry.class_for(style)
+        if cls is None:
+            tag.remove('style')
+            return
+        tag.style_to_class(cls)
+        if len(registry.classes) != known:
+            ctx.after_event('inline_to_class', flush)
+    return convert
+
+
+def build_transforms(names, css_path, rules_path=None):
+    factories = {
+        'line_clamp': lambda: Transform('line_clamp', 'text', line_clamp, kinds=('html', 'css')),
+        'preamble': lambda: Transform('preamble', 'document', preamble, needs=preamble_needed),
+        'manifest': lambda: Transform('manifest', 'tag', extract_manifest),
+        'style_rules': lambda: Transform('style_rules', 'tag', style_rules_transform(rules_path)),
+        'inline_to_class': lambda: Transform('inline_to_class', 'tag', inline_to_class_transform(css_path)),
+    }
+    unknown = [n for n in names if n not in factories]
+    if unknown:
+        raise SystemExit(f'Unknown transforms: {", ".join(unknown)} (known: {", ".join(factories)})')
+    return [factories[name]() for name in names]
+
+
+# --- sledované soubory ------------------------------------------------------
+
+class WatchedFile:
+    """Obsah souboru v paměti (bajty - dekóduje se jen změněný úsek)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.kind = 'css' if self.path.suffix == '.css' else 'html'
+        self.data = None
+        self.stamp = None
+        self.pending = None     # stat změny, která ještě nebyla stejná dva polly po sobě
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def poll(self, settle=True):
+        """(nový obsah, změněný úsek), pokud se soubor od posledně změnil; jinak None
+
+        S settle=True se změna zpracuje až tehdy, když je stat stejný jako
+        v předchozím pollu - rozepsaný soubor (zápis po blocích) se nečte.
+        """
+        stamp = self._stamp()
+        if stamp is None or stamp == self.stamp:
+            self.pending = None
+            return None
+        if settle and stamp != self.pending:
+            self.pending = stamp
+            return None
+        data = self.path.read_bytes()
+        if self._stamp() != stamp:
+            self.pending = None     # zapisuje se právě teď - počká na další polly
+            return None
+        old, self.data, self.stamp, self.pending = self.data, data, stamp, None
+        if old is None:
+            return data, (0, len(data))
+        span = changed_span(old, data)
+        if span is None:
+            return None
+        expand = expand_css if self.kind == 'css' else expand_html
+        return data, expand(data, *span)
+
+    def write(self, data):
+        """Zapíše výsledek transformací; False, pokud se soubor od načtení znovu změnil"""
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_bytes(data)
+        if self._stamp() != self.stamp:
+            # Editor mezitím uložil novější verzi - nepřepsat ji, zpracuje se v dalším pollu
+            tmp.unlink()
+            print(f"{self.path.name}: changed on disk during processing, result not written", flush=True)
+            return False
+        os.replace(tmp, self.path)
+        self.data = data
+        self.stamp = self._stamp()      # vlastní zápis není nová událost
+        return True
+
+
+class Context:
+    """Předává se transformacím: aktuální soubor a zápis vedlejších souborů"""
+
+    def __init__(self, daemon, watched):
+        self.daemon = daemon
+        self.path = watched.path
+        self.deferred = {}
+
+    def write_side_file(self, path, data):
+        watched = self.daemon.watched.get(Path(path).resolve())
+        if watched is not None and watched.data is not None:
+            watched.write(data)
+        else:
+            # ještě nenačtený sledovaný soubor projde transformacemi při příštím pollu
+            Path(path).write_bytes(data)
+
+    def after_event(self, key, func):
+        """func(ctx) se zavolá jednou po dokončení události (např. zápis CSS)"""
+        self.deferred[key] = func
+
+
+class Daemon:
+    def __init__(self, files, transforms, verbose=True):
+        self.watched = {Path(f).resolve(): WatchedFile(f) for f in files}
+        self.transforms = transforms
+        self.verbose = verbose
+        self.events = []
+
+    def _timed(self, t, timings, func, *args):
+        t0 = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - t0
+        t.record(elapsed)
+        timings.append((t.name, elapsed))
+        return result
+
+    def process(self, watched, data, span, started=None):
+        """Aplikuje transformace na úsek [start, end) a zapíše výsledek; vrací True při změně"""
+        started = time.perf_counter() if started is None else started
+        ctx = Context(self, watched)
+        start, end = span
+        region = old_region = data[start:end].decode('utf-8')
+        timings = []
+        applicable = [t for t in self.transforms if watched.kind in t.kinds]
+
+        for t in applicable:
+            if t.scope == 'text':
+                region = self._timed(t, timings, t.func, region, ctx)
+
+        tag_transforms = [t for t in applicable if t.scope == 'tag']
+        if tag_transforms:
+            spent = {t.name: 0.0 for t in tag_transforms}
+
+            def fused(tag):
+                for t in tag_transforms:
+                    t0 = time.perf_counter()
+                    t.func(tag, ctx)
+                    spent[t.name] += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            new_region, changed = rewrite(region, fused)
+            scan = time.perf_counter() - t0 - sum(spent.values())
+            if changed:
+                region = new_region
+            for t in tag_transforms:
+                t.record(spent[t.name])
+                timings.append((t.name, spent[t.name]))
+            timings.append(('tag scan', scan))
+
+        new_data = data if region == old_region else data[:start] + region.encode('utf-8') + data[end:]
+        for t in applicable:
+            if t.scope == 'document' and (t.needs is None or t.needs(new_data)):
+                result = self._timed(t, timings, t.func, new_data.decode('utf-8'), ctx)
+                if result is not None:
+                    new_data = result.encode('utf-8')
+
+        rewritten = new_data != data and watched.write(new_data)
+        for func in ctx.deferred.values():
+            func(ctx)
+        total = time.perf_counter() - started
+        self.events.append(total)
+        if self.verbose:
+            parts = ', '.join(f'{name} {sec * 1000:.1f}' for name, sec in timings)
+            print(f"{watched.path.name}: {'rewritten' if rewritten else 'no changes'}, "
+                  f"region {(end - start) / 1024:.1f} KiB [{parts}] edit-to-result {total * 1000:.1f} ms",
+                  flush=True)
+        return rewritten
+
+    def poll_once(self, settle=True):
+        detected = 0
+        for watched in list(self.watched.values()):
+            started = time.perf_counter()
+            found = watched.poll(settle)
+            if found is not None:
+                detected += 1
+                self.process(watched, *found, started=started)
+        return detected
+
+    def run(self, interval):
+        print(f"Watching {', '.join(str(p) for p in self.watched)} "
+              f"({', '.join(t.name for t in self.transforms)}); Ctrl+C to stop", flush=True)
+        try:
+            while True:
+                self.poll_once()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.summary()
+
+    def summary(self):
+        print(f"\n{'transform':<16} {'calls':>6} {'mean ms':>8} {'p95 ms':>8}")
+        for t in self.transforms:
+            if t.calls:
+                samples = sorted(t.samples)
+                p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+                print(f"{t.name:<16} {t.calls:>6} {t.seconds / t.calls * 1000:8.2f} {p95 * 1000:8.2f}")
+        if self.events:
+            print(f"{len(self.events)} events, mean {sum(self.events) / len(self.events) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep HTML/CSS in memory and re-apply tool transforms on save')
+    parser.add_argument('files', nargs='*', type=Path, default=list(DEFAULT_FILES))
+    parser.add_argument('--transforms', nargs='+', default=list(DEFAULT_TRANSFORMS))
+    parser.add_argument('--css', type=Path, default=ROOT / 'css' / 'styles.css',
+                        help='stylesheet for inline_to_class')
+    parser.add_argument('--rules', type=Path, help='rule table for style_rules')
+    parser.add_argument('--interval', type=float, default=50, help='poll interval in ms')
+    parser.add_argument('--once', action='store_true', help='process the files once and exit')
+    args = parser.parse_args()
+
+    daemon = Daemon(args.files, build_transforms(args.transforms, args.css.resolve(), args.rules))
+    if args.once:
+        daemon.poll_once(settle=False)
+        daemon.summary()
+        return
+    daemon.run(args.interval / 1000)
+
+
+if __name__ == '__main__':
+    main()